@@ -0,0 +1,8 @@
+"""
+Benchmarks for the Codenames AI. Each module can be run with
+`python -m benchmarks.<name>` from the root of the repository.
+
+`benchmarks.suite` times every stage of giving a clue and whole games, and
+can compare two git revisions; the other modules each compare one
+optimization with what it replaced.
+"""
@@ -0,0 +1,38 @@
+"""
+Boards to benchmark on, matching the ones in `tests/test_ai.py`.
+"""
+from codenames import CodenamesBoard, Team
+
+
+def standard_board() -> CodenamesBoard:
+    words = ['STATE', 'LOCK', 'GAME', 'ALPS', 'TAIL',
+             'YARD', 'MICROSCOPE', 'CAP', 'MILK', 'SNOWMAN',
+             'MATCH', 'SWING', 'AIR', 'ORGAN', 'SCHOOL',
+             'NEEDLE', 'CROSS', 'TEMPLE', 'ARM', 'TAP',
+             'PIN', 'BUCK', 'MINT', 'POLE', 'CENTER']
+    spy_values = [Team.neutral, Team.blue, Team.red, Team.blue, Team.neutral,
+                  Team.red, Team.blue, Team.red, Team.red, Team.red,
+                  Team.blue, Team.red, Team.blue, Team.red, Team.red,
+                  Team.neutral, Team.neutral, Team.neutral, Team.blue, Team.neutral,
+                  Team.neutral, Team.blue, Team.red, Team.blue, Team.assassin]
+    return CodenamesBoard(words=words, spy_values=spy_values, known_values=[Team.unknown] * 25)
+
+
+def problematic_board() -> CodenamesBoard:
+    """
+    The endgame from `bug.txt`, where the AI used to get stuck.
+    """
+    words = ['WHIP', 'CORNER', 'EGYPT', 'CENTAUR', 'POISON',
+             'ROW', 'POUND']
+    spy_values = [Team.neutral, Team.blue, Team.blue, Team.red, Team.neutral,
+                  Team.assassin, Team.neutral]
+    return CodenamesBoard(words=words, spy_values=spy_values, known_values=[Team.unknown] * 7)
+
+
+# Each fixture is a name, a function that makes the board, and the team
+# whose spymaster is giving the clue.
+BOARDS = [
+    ('standard-red', standard_board, Team.red),
+    ('standard-blue', standard_board, Team.blue),
+    ('problematic-red', problematic_board, Team.red),
+]
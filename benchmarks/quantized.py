@@ -0,0 +1,67 @@
+"""
+Compare the clue vectors stored as float32 with the quantized types from
+`codenames.vectors.quantize`: how much memory the matrix takes, how long
+the similarity of the vocabulary to a board takes, and how often the AI
+spymaster's clue changes.
+
+    python -m benchmarks.quantized [--boards N] [--repeat N]
+"""
+import argparse
+import random
+import timeit
+
+import numpy as np
+
+from benchmarks.fixtures import BOARDS
+from codenames import CodenamesBoard, NullChannel, Team, ai, tag_en
+from codenames.ai import AISpymaster
+from codenames.vectors import DTYPES, quantize
+
+
+def clues(boards):
+    return [AISpymaster(team, NullChannel()).get_clue(board) for (board, team) in boards]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--boards', type=int, default=50,
+                        help="number of random boards, on top of the fixtures")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    boards = [(make_board(), team) for (_, make_board, team) in BOARDS]
+    boards += [
+        (CodenamesBoard.generate(random.Random(seed)), Team.red)
+        for seed in range(args.boards)
+    ]
+    labels = [tag_en(word) for word in boards[0][0].words]
+
+    original = quantize(ai.get_vectors(), 'float32')
+    baseline = None
+    print('%-8s %12s %16s %12s %10s' % (
+        'dtype', 'matrix (MB)', 'similarity (ms)', 'max error', 'same clue'
+    ))
+    try:
+        for dtype in DTYPES:
+            vectors = quantize(original, dtype)
+            ai.set_vectors(vectors)
+            nbytes = vectors.matrix.nbytes
+            if vectors.scales is not None:
+                nbytes += vectors.scales.nbytes
+            elapsed = min(timeit.repeat(
+                lambda: vectors.similarity(labels), number=1, repeat=args.repeat
+            ))
+            error = np.max(np.abs(vectors.similarity(labels) - original.similarity(labels)))
+            chosen = clues(boards)
+            if baseline is None:
+                baseline = chosen
+            same = np.mean([a == b for (a, b) in zip(chosen, baseline)])
+            print('%-8s %12.1f %16.2f %12.5f %10.3f' % (
+                dtype, nbytes / 1e6, elapsed * 1000, error, same
+            ))
+    finally:
+        ai.set_vectors(original)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Compare the clue-ranking stage of `AISpymaster.solve_clue` against the full
+sort it replaced.
+
+The old ranking sorted every row of the V x G probability matrix, then
+sorted the whole vocabulary once per clue count to take the top 50. The
+current one, `ai.rank_clues`, partitions instead of sorting, and only sorts
+what it keeps.
+
+    python -m benchmarks.ranking [--repeat N] [--tile N]
+
+`--tile` stacks copies of the vocabulary to estimate the speedup on a
+larger one.
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from benchmarks.fixtures import BOARDS
+from codenames import tag_en
+from codenames.ai import clue_probabilities, get_vectors, rank_clues
+
+
+def full_sort_ranking(combined_probs, ncandidates=50):
+    prob_values = np.sort(combined_probs, axis=1)[:, ::-1][:, :9]
+    products = np.cumprod(prob_values, axis=1)
+    ranked = [
+        np.argsort(-products[:, col], kind='stable')[:ncandidates]
+        for col in range(products.shape[1])
+    ]
+    return prob_values, ranked
+
+
+def board_probabilities(board, team):
+    unrevealed = board.unrevealed_items()
+    board_vocab = [tag_en(word) for (word, _) in unrevealed]
+    simframe = get_vectors().similarity(board_vocab)
+    values = np.array([value.value_for_team(team) for (_, value) in unrevealed])
+    return clue_probabilities(simframe, values)
+
+
+def best_time(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--tile', type=int, default=1)
+    args = parser.parse_args()
+
+    print('%-18s %8s %12s %12s %8s' % ('board', 'vocab', 'sort (ms)', 'select (ms)', 'speedup'))
+    for name, make_board, team in BOARDS:
+        combined_probs = np.tile(board_probabilities(make_board(), team), (args.tile, 1))
+
+        old_values, old_ranked = full_sort_ranking(combined_probs)
+        new_values, new_ranked = rank_clues(combined_probs)
+        assert np.array_equal(old_values, new_values)
+        for old, new in zip(old_ranked, new_ranked):
+            assert np.array_equal(old, new)
+
+        old_time = best_time(lambda: full_sort_ranking(combined_probs), args.repeat)
+        new_time = best_time(lambda: rank_clues(combined_probs), args.repeat)
+        print('%-18s %8d %12.2f %12.2f %7.1fx' % (
+            name, combined_probs.shape[0], old_time * 1000, new_time * 1000,
+            old_time / new_time
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Measure how much `ShortlistSpymaster` loses against scoring the whole
+vocabulary, and how much time it saves.
+
+For each board, this reports the recall of the shortlist (the fraction of
+the clues that exhaustive scoring ranks as candidates that are in the
+shortlist), how often the shortlist spymaster gives the same clue, and the
+time each one takes to give its first clue on the board.
+
+    python -m benchmarks.shortlist [--boards N] [--nprobe N ...] [--per-word N]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from benchmarks.fixtures import BOARDS
+from codenames import CodenamesBoard, NullChannel, Team, tag_en
+from codenames.ai import (
+    AISpymaster, BoardState, ShortlistSpymaster, get_cluster_index, get_vectors, rank_clues
+)
+
+
+def candidate_rows(board, team):
+    """
+    The rows of the vocabulary that exhaustive scoring ranks as candidates.
+    """
+    state = BoardState(get_vectors(), board, team)
+    _, ranked = rank_clues(state.combined_probs(), AISpymaster.candidates_per_count, state.legal)
+    return np.unique(np.concatenate(ranked))
+
+
+def shortlist_rows(board, team, per_word, nprobe):
+    vectors = get_vectors()
+    good_labels = [
+        tag_en(word) for (word, value) in board.unrevealed_items()
+        if value.value_for_team(team) > 0
+    ]
+    return get_cluster_index().candidates(
+        vectors, vectors.vectors_for(good_labels), per_word, nprobe
+    )
+
+
+def timed_clue(spymaster, board):
+    start = time.perf_counter()
+    clue = spymaster.get_clue(board)
+    return clue, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--boards', type=int, default=50,
+                        help="number of random boards, on top of the fixtures")
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[2, 4, 8, 16])
+    parser.add_argument('--per-word', type=int, default=ShortlistSpymaster.shortlist_per_word)
+    args = parser.parse_args()
+
+    # Load everything before timing anything
+    get_cluster_index()
+    boards = [(make_board(), team) for (_, make_board, team) in BOARDS]
+    boards += [
+        (CodenamesBoard.generate(random.Random(seed)), Team.red)
+        for seed in range(args.boards)
+    ]
+    vocab_size = get_vectors().matrix.shape[0]
+
+    exhaustive = []
+    for board, team in boards:
+        exhaustive.append(timed_clue(AISpymaster(team, NullChannel()), board))
+    candidates = [candidate_rows(board, team) for (board, team) in boards]
+
+    print('vocabulary: %d, boards: %d, shortlist per word: %d'
+          % (vocab_size, len(boards), args.per_word))
+    print('%8s %10s %8s %10s %10s %10s' % (
+        'nprobe', 'shortlist', 'recall', 'same clue', 'mean (ms)', 'p95 (ms)'
+    ))
+    times = [elapsed for (_, elapsed) in exhaustive]
+    print('%8s %10d %8.3f %10.3f %10.2f %10.2f' % (
+        'all', vocab_size, 1., 1., np.mean(times) * 1000, np.percentile(times, 95) * 1000
+    ))
+    for nprobe in args.nprobe:
+        sizes = []
+        recalls = []
+        same = []
+        times = []
+        for (board, team), wanted, (clue, _) in zip(boards, candidates, exhaustive):
+            rows = shortlist_rows(board, team, args.per_word, nprobe)
+            sizes.append(len(rows))
+            recalls.append(np.isin(wanted, rows).mean())
+            spymaster = ShortlistSpymaster(team, NullChannel())
+            spymaster.shortlist_per_word = args.per_word
+            spymaster.nprobe = nprobe
+            shortlist_clue, elapsed = timed_clue(spymaster, board)
+            same.append(shortlist_clue == clue)
+            times.append(elapsed)
+        print('%8d %10d %8.3f %10.3f %10.2f %10.2f' % (
+            nprobe, np.mean(sizes), np.mean(recalls), np.mean(same),
+            np.mean(times) * 1000, np.percentile(times, 95) * 1000
+        ))
+
+
+if __name__ == '__main__':
+    main()
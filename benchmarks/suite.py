@@ -0,0 +1,383 @@
+"""
+Time each stage of giving a clue, a turn of AI guesses, and whole
+self-play games, on the fixture boards plus boards generated from fixed
+seeds.
+
+    python -m benchmarks.suite [--only NAME ...] [--json FILE]
+    python -m benchmarks.suite --compare REV [--against REV]
+
+Each benchmark reports the latency percentiles of its calls, and the peak
+memory that Python and NumPy allocate during one pass through them, as
+traced by `tracemalloc`.
+
+`--compare` runs the suite on another git revision, in a temporary
+worktree, and then on this checkout (or the revision given by
+`--against`), each in a fresh process, and shows the changes. The
+benchmark code is copied from this checkout into the worktree, so both
+revisions are measured the same way. Data files that git doesn't track,
+such as `mini.h5` and the vector store, are linked into the worktree.
+Each benchmark imports what it needs when it's set up, so a benchmark
+that uses something a revision doesn't have is reported as missing on
+that revision, and one that raises anything else is reported as failed,
+instead of stopping the suite.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import partial
+
+import numpy as np
+
+from benchmarks.fixtures import BOARDS
+from codenames import CodenamesBoard, Team
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join('codenames', 'data')
+
+
+class QuietChannel:
+    """
+    Ignores everything it's told, like `codenames.NullChannel`, which older
+    revisions don't have.
+    """
+    def notify(self, tag, speaker, value):
+        pass
+
+    def await_input(self, prompt):
+        raise RuntimeError("Nobody is listening to this channel")
+
+
+def random_board(seed):
+    """
+    The board that `CodenamesBoard.generate(random.Random(seed))` makes,
+    built here because older revisions can't generate seeded boards.
+    """
+    from codenames import WORDLIST
+
+    rng = random.Random(seed)
+    words = rng.sample(WORDLIST, 25)
+    teams = [Team.red] * 9 + [Team.blue] * 8 + [Team.neutral] * 7 + [Team.assassin]
+    rng.shuffle(teams)
+    return CodenamesBoard(words, teams, [Team.unknown] * 25)
+
+
+def fixture_boards(args):
+    boards = [(make_board(), team) for (_, make_board, team) in BOARDS]
+    boards += [(random_board(seed), Team.red) for seed in range(args.boards)]
+    return boards
+
+
+def board_inputs(board, team):
+    from codenames import tag_en
+
+    unrevealed = board.unrevealed_items()
+    board_vocab = [tag_en(word) for (word, _) in unrevealed]
+    values = np.array([value.value_for_team(team) for (_, value) in unrevealed])
+    return board_vocab, values
+
+
+def load_vectors_calls(args):
+    from codenames import ai
+
+    return [ai._load_vectors]
+
+
+def loaded_vectors():
+    """
+    Load the vectors, so that loading isn't timed as part of the first call.
+    This uses `ai.VECTORS`, which every revision has, instead of the newer
+    `ai.get_vectors()`.
+    """
+    from codenames import ai
+
+    return ai.VECTORS
+
+
+def similarity_calls(args):
+    vectors = loaded_vectors()
+    return [
+        partial(vectors.similarity, board_inputs(board, team)[0])
+        for (board, team) in fixture_boards(args)
+    ]
+
+
+def _solve_clue(board, team):
+    from codenames import ai
+
+    board_vocab, values = board_inputs(board, team)
+    simframe = loaded_vectors().similarity(board_vocab)
+    return ai.AISpymaster(team, QuietChannel()).solve_clue(board, simframe, values, board_vocab)
+
+
+def solve_clue_calls(args):
+    loaded_vectors()
+    return [partial(_solve_clue, board, team) for (board, team) in fixture_boards(args)]
+
+
+def _get_clue(board, team):
+    from codenames.ai import AISpymaster
+
+    return AISpymaster(team, QuietChannel()).get_clue(board)
+
+
+def get_clue_calls(args):
+    loaded_vectors()
+    return [partial(_get_clue, board, team) for (board, team) in fixture_boards(args)]
+
+
+def _check_clues(board, clues):
+    return [board.clue_is_ok(clue) for clue in clues]
+
+
+def clue_is_ok_calls(args):
+    labels = loaded_vectors().frame.index
+    clues = [labels[i][6:] for i in np.linspace(0, len(labels) - 1, args.clues, dtype=int)]
+    return [partial(_check_clues, board, clues) for (board, _) in fixture_boards(args)]
+
+
+def _guess_turn(guesser, board, clue_word):
+    guesser.receive_clue(3, clue_word)
+    return [guesser.get_guess(board) for _ in range(4)]
+
+
+def get_guess_calls(args):
+    from codenames import ai
+
+    loaded_vectors()
+    return [
+        partial(_guess_turn, ai.AIGuesser(team, QuietChannel()), board, board.words[0].lower())
+        for (board, team) in fixture_boards(args)
+    ]
+
+
+def selfplay_calls(args):
+    from codenames import ai, selfplay
+
+    loaded_vectors()
+    return [partial(selfplay.play_game, seed) for seed in range(args.games)]
+
+
+# Each benchmark is a function that sets up the calls to time, and how many
+# times to time each call, given the command-line arguments. A benchmark's
+# result is None if it's missing from the revision, or has an 'error' if it
+# failed.
+BENCHMARKS = {
+    'load_vectors': (load_vectors_calls, lambda args: args.load_repeat),
+    'similarity': (similarity_calls, lambda args: args.repeat),
+    'solve_clue': (solve_clue_calls, lambda args: args.repeat),
+    'get_clue': (get_clue_calls, lambda args: args.repeat),
+    'clue_is_ok': (clue_is_ok_calls, lambda args: args.repeat),
+    'get_guess': (get_guess_calls, lambda args: args.repeat),
+    'selfplay': (selfplay_calls, lambda args: 1),
+}
+PERCENTILES = [50, 90, 99]
+
+
+def measure(calls, repeat):
+    """
+    Time `repeat` runs of each call, then run each one more time with
+    `tracemalloc` on to find the peak memory of any of them.
+    """
+    samples = []
+    for call in calls:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            call()
+            samples.append(time.perf_counter() - start)
+
+    peak = 0
+    tracemalloc.start()
+    try:
+        for call in calls:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            call()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    result = {
+        'calls': len(samples),
+        'mean': float(np.mean(samples)),
+        'peak_bytes': peak,
+    }
+    for pct, value in zip(PERCENTILES, np.percentile(samples, PERCENTILES)):
+        result['p%d' % pct] = float(value)
+    return result
+
+
+def max_rss_bytes() -> int:
+    """
+    The peak resident memory of this process. `ru_maxrss` is in kilobytes,
+    except on macOS, where it's in bytes.
+    """
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return max_rss
+    return max_rss * 1024
+
+
+def run_suite(args):
+    results = {}
+    for name in args.only or list(BENCHMARKS):
+        setup, repeat = BENCHMARKS[name]
+        try:
+            results[name] = measure(setup(args), repeat(args))
+        except (ImportError, AttributeError) as exc:
+            print('%s is missing: %r' % (name, exc), file=sys.stderr)
+            results[name] = None
+        except Exception as exc:
+            print('%s failed: %r' % (name, exc), file=sys.stderr)
+            results[name] = {'error': repr(exc)}
+    results['max_rss_bytes'] = max_rss_bytes()
+    return results
+
+
+def _unavailable(result):
+    """
+    Why there are no timings for a result, or None if there are.
+    """
+    if result is None:
+        return 'missing'
+    elif 'error' in result:
+        return 'failed'
+    return None
+
+
+def print_results(results):
+    header = ['benchmark', 'calls', 'mean (ms)'] + ['p%d (ms)' % pct for pct in PERCENTILES]
+    print('%-14s %6s' % tuple(header[:2]) + ''.join(' %10s' % h for h in header[2:])
+          + ' %10s' % 'peak (MB)')
+    for name, result in results.items():
+        if name == 'max_rss_bytes':
+            continue
+        if _unavailable(result):
+            print('%-14s %6s' % (name, _unavailable(result)))
+            continue
+        times = [result['mean']] + [result['p%d' % pct] for pct in PERCENTILES]
+        print('%-14s %6d' % (name, result['calls']) + ''.join(' %10.2f' % (t * 1000) for t in times)
+              + ' %10.1f' % (result['peak_bytes'] / 1e6))
+    print('max RSS: %.1f MB' % (results['max_rss_bytes'] / 1e6))
+
+
+def print_comparison(base_rev, base, new_rev, new):
+    print('%s -> %s' % (base_rev, new_rev))
+    print('%-14s %12s %12s %8s %12s %12s' % (
+        'benchmark', 'p50 before', 'p50 after', 'ratio', 'peak before', 'peak after'
+    ))
+    for name in BENCHMARKS:
+        if name not in base and name not in new:
+            continue
+        before = base.get(name)
+        after = new.get(name)
+        cells = [
+            '%12s' % _unavailable(result) if _unavailable(result)
+            else '%12.2f' % (result['p50'] * 1000)
+            for result in (before, after)
+        ]
+        ratio = '%8s' % ''
+        if not _unavailable(before) and not _unavailable(after):
+            ratio = '%7.2fx' % (after['p50'] / before['p50'])
+        peaks = [
+            '%12s' % _unavailable(result) if _unavailable(result)
+            else '%12.1f' % (result['peak_bytes'] / 1e6)
+            for result in (before, after)
+        ]
+        print('%-14s %s %s %s %s %s' % (name, cells[0], cells[1], ratio, peaks[0], peaks[1]))
+    print('max RSS (MB): %.1f -> %.1f' % (base['max_rss_bytes'] / 1e6, new['max_rss_bytes'] / 1e6))
+
+
+def _suite_args(args, json_filename):
+    argv = [
+        '--boards', str(args.boards), '--repeat', str(args.repeat),
+        '--load-repeat', str(args.load_repeat), '--games', str(args.games),
+        '--clues', str(args.clues), '--json', json_filename,
+    ]
+    if args.only:
+        argv += ['--only'] + args.only
+    return argv
+
+
+def run_in_tree(tree, args, json_filename):
+    """
+    Run the suite in a fresh process, importing `codenames` from `tree`.
+    """
+    env = dict(os.environ, PYTHONPATH=tree)
+    subprocess.run(
+        [sys.executable, '-m', 'benchmarks.suite'] + _suite_args(args, json_filename),
+        cwd=tree, env=env, check=True
+    )
+    with open(json_filename) as infile:
+        return json.load(infile)
+
+
+def make_worktree(rev, directory):
+    """
+    Check out `rev` in a new worktree in `directory`, with this checkout's
+    benchmarks and untracked data files.
+    """
+    subprocess.run(['git', 'worktree', 'add', '--detach', directory, rev], cwd=ROOT, check=True)
+    benchmarks_dir = os.path.join(directory, 'benchmarks')
+    shutil.rmtree(benchmarks_dir, ignore_errors=True)
+    shutil.copytree(os.path.join(ROOT, 'benchmarks'), benchmarks_dir,
+                    ignore=shutil.ignore_patterns('__pycache__'))
+    for filename in os.listdir(os.path.join(ROOT, DATA_DIR)):
+        target = os.path.join(directory, DATA_DIR, filename)
+        if not os.path.exists(target):
+            os.symlink(os.path.join(ROOT, DATA_DIR, filename), target)
+
+
+def compare(args):
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for i, rev in enumerate([args.compare, args.against]):
+            json_filename = os.path.join(tmpdir, 'results-%d.json' % i)
+            if rev is None:
+                results.append(run_in_tree(ROOT, args, json_filename))
+                continue
+            tree = os.path.join(tmpdir, 'tree-%d' % i)
+            make_worktree(rev, tree)
+            try:
+                results.append(run_in_tree(tree, args, json_filename))
+            finally:
+                subprocess.run(['git', 'worktree', 'remove', '--force', tree], cwd=ROOT, check=True)
+    print_comparison(args.compare, results[0], args.against or 'working tree', results[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS))
+    parser.add_argument('--boards', type=int, default=20,
+                        help="number of random boards, on top of the fixtures")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--load-repeat', type=int, default=3)
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--clues', type=int, default=200,
+                        help="number of clues to check on each board for clue_is_ok")
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--compare', metavar='REV',
+                        help="compare this git revision with the working tree")
+    parser.add_argument('--against', metavar='REV',
+                        help="with --compare, compare with this revision instead")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args)
+        return
+    results = run_suite(args)
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as out:
+            json.dump(results, out, indent=2)
+
+
+if __name__ == '__main__':
+    main()
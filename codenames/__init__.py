@@ -1,12 +1,17 @@
 import json
+import struct
 from enum import Enum
-from typing import List, Tuple, Dict, Set
+from functools import lru_cache
+from collections.abc import MutableSequence, Sequence
+from typing import List, Tuple, Dict, Set, Iterable, Iterator, IO
 
 import random
-from conceptnet5.db.query import AssertionFinder
+import numpy as np
 from conceptnet5.vectors import standardized_uri
 from pkg_resources import resource_filename
 
+from codenames.legality import get_finder, get_forbidden_index, cached_forms_of, is_form_of
+
 WORDLIST = [
     line.strip() for line in open(
         resource_filename('codenames', 'data/codenames-words.txt')
@@ -41,83 +46,241 @@ class Team(Enum):
             return -2
 
 
+# The teams, indexed by their values, for decoding the arrays in a board
+TEAMS_BY_VALUE = tuple(Team)
+
+# Constants for the binary encoding of boards
+BINARY_VERSION = 1
+CUSTOM_WORD = 0xFFFF
+TEAM_BITS = 3
+_TEAM_BIT_WEIGHTS = 1 << np.arange(TEAM_BITS - 1, -1, -1)
+_WORD_INDEX = {word: i for (i, word) in enumerate(WORDLIST)}
+
+
+class TeamValues(MutableSequence):
+    """
+    A list-like view of the team of each word in one of a board's arrays.
+    Assigning to it changes the board, and keeps its scores up to date.
+    Words can't be added or removed through it.
+    """
+    __slots__ = ('_board', '_attr')
+
+    def __init__(self, board: 'CodenamesBoard', attr: str):
+        self._board = board
+        self._attr = attr
+
+    def _values(self) -> np.ndarray:
+        return getattr(self._board, self._attr)
+
+    def __len__(self):
+        return len(self._values())
+
+    def __getitem__(self, index):
+        values = self._values()
+        if isinstance(index, slice):
+            return [TEAMS_BY_VALUE[value] for value in values[index].tolist()]
+        return TEAMS_BY_VALUE[values[index]]
+
+    def __setitem__(self, index, teams):
+        values = self._values()
+        if isinstance(index, slice):
+            new_values = [team.value for team in teams]
+            if len(new_values) != len(values[index]):
+                raise ValueError("Can't change the number of words on a board")
+            values[index] = new_values
+        else:
+            values[index] = teams.value
+        self._board._count_remaining()
+
+    def __delitem__(self, index):
+        raise TypeError("Can't remove words from a board")
+
+    def insert(self, index, team):
+        raise TypeError("Can't add words to a board")
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
 class CodenamesBoard:
-    def __init__(self, words: List[str], spy_values: List[Team], known_values: List[Team]):
-        self.words = words
+    """
+    The state of a game: the words on the board, which team each of them
+    belongs to, and which ones have been revealed.
+
+    The teams are stored as small arrays of `Team` values, and the number of
+    each team's words left to reveal is kept up to date, so that looking up
+    a word, the scores, or the winner doesn't scan the board.
+    """
+    __slots__ = ('words', '_finder', '_positions', '_spy', '_known', '_remaining', '__weakref__')
+
+    def __init__(self, words: List[str], spy_values: List[Team], known_values: List[Team],
+                 finder=None):
+        self._set_state(
+            words,
+            np.array([team.value for team in spy_values], dtype=np.int8),
+            np.array([team.value for team in known_values], dtype=np.int8),
+            finder
+        )
+
+    def _set_state(self, words: List[str], spy: np.ndarray, known: np.ndarray, finder=None):
+        self.words = list(words)
 
         # Make sure we're not accidentally putting ConceptNet labels into
         # the game state
         assert not self.words[0].startswith('/c/en/')
-        self.spy_values = spy_values
-        self.known_values = known_values
-        self.finder = AssertionFinder()
+        self._positions = {word: i for (i, word) in enumerate(self.words)}
+        self._spy = spy
+        self._known = known
+        self._count_remaining()
+        self._finder = finder
+
+    def _count_remaining(self):
+        self._remaining = {
+            team: int(np.sum(self._spy == team.value)) - int(np.sum(self._known == team.value))
+            for team in (Team.red, Team.blue)
+        }
+
+    @property
+    def finder(self):
+        """
+        The ConceptNet `AssertionFinder` for checking clues: the one this
+        board was given, or else the one shared by the whole process, which
+        only connects to the database when it's first asked something.
+        """
+        if self._finder is None:
+            return get_finder()
+        return self._finder
+
+    @property
+    def spy_values(self) -> TeamValues:
+        return TeamValues(self, '_spy')
+
+    @spy_values.setter
+    def spy_values(self, teams: List[Team]):
+        self.spy_values[:] = teams
+
+    @property
+    def known_values(self) -> TeamValues:
+        return TeamValues(self, '_known')
+
+    @known_values.setter
+    def known_values(self, teams: List[Team]):
+        self.known_values[:] = teams
 
     @staticmethod
-    def generate():
-        words = random.sample(WORDLIST, 25)
+    def generate(rng: random.Random = None):
+        """
+        Make a random board. Pass a seeded `random.Random` as `rng` to make
+        the same board every time.
+        """
+        if rng is None:
+            rng = random
+        words = rng.sample(WORDLIST, 25)
         teams = [Team.red] * 9 + [Team.blue] * 8 + [Team.neutral] * 7 + [Team.assassin]
-        random.shuffle(teams)
+        rng.shuffle(teams)
         return CodenamesBoard(words, teams, [Team.unknown] * 25)
 
     def _is_form_of(self, word: str, clue: str) -> bool:
-        return self.finder.query({'node': tag_en(word), 'other': tag_en(clue),
-                                    'rel': '/r/FormOf', 'sources': '/s/resource/wiktionary/en/'})
+        return is_form_of(self.finder, word, clue)
 
     def clue_is_ok(self, clue: str) -> bool:
         assert not clue.startswith('/c/en/')
         clue = clue.upper()
+        index = get_forbidden_index()
         for word in self.words:
-            if word == clue:
-                return False
-            elif word in clue:
+            if word in clue:
                 return False
-            elif self._is_form_of(word, clue):
+            forbidden = index.get(word)
+            if forbidden is None:
+                # This word isn't in the precomputed index, so ask ConceptNet
+                if self._is_form_of(word, clue):
+                    return False
+            elif clue in forbidden:
                 return False
         return True
 
+    def clue_mask(self, clues: np.ndarray, exclude: Iterable[str] = ()) -> np.ndarray:
+        """
+        Check a whole vocabulary of clues at once. `clues` is an array of
+        upper-case clue words. Returns a boolean array that's True for the
+        clues that are legal on this board and aren't in `exclude`.
+
+        This asks ConceptNet at most one question per word on the board that
+        isn't in the forbidden-clue index, instead of one per clue.
+        """
+        index = get_forbidden_index()
+        forbidden = {clue.upper() for clue in exclude}
+        legal = np.ones(len(clues), dtype=bool)
+        for word in self.words:
+            legal &= np.char.find(clues, word) < 0
+            forms = index.get(word)
+            if forms is None:
+                forms = cached_forms_of(self.finder, word)
+            forbidden.update(forms)
+        if forbidden:
+            legal &= ~np.isin(clues, list(forbidden))
+        return legal
+
+    def _position(self, word: str) -> int:
+        try:
+            return self._positions[word]
+        except KeyError:
+            raise ValueError("%r is not on the board" % word)
+
     def get_word_team(self, word: str) -> Team:
-        idx = self.words.index(word)
-        return self.spy_values[idx]
+        return TEAMS_BY_VALUE[self._spy[self._position(word)]]
 
     def reveal_word(self, word: str) -> None:
-        idx = self.words.index(word)
-        self.known_values[idx] = self.spy_values[idx]
+        idx = self._position(word)
+        if self._known[idx] == Team.unknown.value:
+            team = TEAMS_BY_VALUE[self._spy[idx]]
+            self._known[idx] = team.value
+            if team in self._remaining:
+                self._remaining[team] -= 1
 
     def scores(self) -> Dict[Team, int]:
-        return {
-            Team.red: self.spy_values.count(Team.red) - self.known_values.count(Team.red),
-            Team.blue: self.spy_values.count(Team.blue) - self.known_values.count(Team.blue)
-        }
+        return dict(self._remaining)
 
     def winner(self) -> Team:
-        scores = self.scores()
-        if scores[Team.red] == 0:
+        if self._remaining[Team.red] == 0:
             return Team.red
-        elif scores[Team.blue] == 0:
+        elif self._remaining[Team.blue] == 0:
             return Team.blue
         else:
             return Team.unknown
 
     def known_items(self) -> List[Tuple[str, Team]]:
-        return list(zip(self.words, self.known_values))
+        return [
+            (word, TEAMS_BY_VALUE[value]) for (word, value) in zip(self.words, self._known.tolist())
+        ]
 
     def spy_items(self) -> List[Tuple[str, Team]]:
-        return list(zip(self.words, self.spy_values))
+        return [
+            (word, TEAMS_BY_VALUE[value]) for (word, value) in zip(self.words, self._spy.tolist())
+        ]
 
     def unrevealed_items(self) -> List[Tuple[str, Team]]:
-        items = []
-        for i in range(len(self.words)):
-            if self.known_values[i] == Team.unknown:
-                items.append((self.words[i], self.spy_values[i]))
-        return items
+        return [
+            (self.words[i], TEAMS_BY_VALUE[self._spy[i]])
+            for i in np.flatnonzero(self._known == Team.unknown.value).tolist()
+        ]
 
     def valid_guesses(self) -> Set[str]:
-        return {word for (word, team) in self.unrevealed_items()}
+        return {
+            self.words[i]
+            for i in np.flatnonzero(self._known == Team.unknown.value).tolist()
+        }
 
     def to_json(self):
         items = [
-            (self.words[i], self.spy_values[i].name, self.known_values[i].name)
-            for i in range(len(self.words))
+            (word, TEAMS_BY_VALUE[spy_value].name, TEAMS_BY_VALUE[known_value].name)
+            for (word, spy_value, known_value)
+            in zip(self.words, self._spy.tolist(), self._known.tolist())
         ]
         return json.dumps(items)
 
@@ -129,6 +292,101 @@ class CodenamesBoard:
         known_values = [Team[name] for name in known_texts]
         return CodenamesBoard(words, spy_values, known_values)
 
+    def to_bytes(self) -> bytes:
+        """
+        Encode the board in a compact binary format. The encoding is a header
+        of a version byte and the number of words, then each word's index in
+        `WORDLIST` as a 16-bit integer, then the spy and known teams of each
+        word as packed 3-bit codes. Words that aren't in `WORDLIST` get the
+        index 0xFFFF, and are spelled out at the end, each prefixed by its
+        length in bytes.
+
+        A standard 25-word board takes 71 bytes. Because the counts are single
+        bytes, a board can have at most 255 words, and a word that isn't in
+        `WORDLIST` can be at most 255 bytes long in UTF-8; a board over either
+        limit raises a ValueError.
+        """
+        nwords = len(self.words)
+        if nwords > 0xFF:
+            raise ValueError("Can't encode a board of more than 255 words: %d" % nwords)
+        indices = np.array(
+            [_WORD_INDEX.get(word, CUSTOM_WORD) for word in self.words], dtype='<u2'
+        )
+        codes = np.concatenate([self._spy, self._known]).astype(np.uint8)
+        bits = np.unpackbits(codes[:, np.newaxis], axis=1)[:, -TEAM_BITS:]
+        pieces = [
+            struct.pack('<BB', BINARY_VERSION, nwords),
+            indices.tobytes(),
+            np.packbits(bits.ravel()).tobytes()
+        ]
+        for word, index in zip(self.words, indices):
+            if index == CUSTOM_WORD:
+                encoded = word.encode('utf-8')
+                if len(encoded) > 0xFF:
+                    raise ValueError("Can't encode a word longer than 255 bytes: %r" % word)
+                pieces.append(struct.pack('<B', len(encoded)))
+                pieces.append(encoded)
+        return b''.join(pieces)
+
+    @staticmethod
+    def from_bytes(data: bytes) -> 'CodenamesBoard':
+        """
+        Decode a board encoded by `to_bytes`.
+        """
+        version, nwords = struct.unpack_from('<BB', data)
+        if version != BINARY_VERSION:
+            raise ValueError("Unknown board encoding version: %d" % version)
+        pos = 2
+        indices = np.frombuffer(data, dtype='<u2', count=nwords, offset=pos).tolist()
+        pos += 2 * nwords
+        nbytes = (2 * nwords * TEAM_BITS + 7) // 8
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8, count=nbytes, offset=pos))
+        pos += nbytes
+        codes = bits[:2 * nwords * TEAM_BITS].reshape(-1, TEAM_BITS) @ _TEAM_BIT_WEIGHTS
+
+        words = []
+        for index in indices:
+            if index == CUSTOM_WORD:
+                length = data[pos]
+                words.append(bytes(data[pos + 1:pos + 1 + length]).decode('utf-8'))
+                pos += 1 + length
+            else:
+                words.append(WORDLIST[index])
+
+        board = CodenamesBoard.__new__(CodenamesBoard)
+        board._set_state(
+            words, codes[:nwords].astype(np.int8), codes[nwords:].astype(np.int8)
+        )
+        return board
+
+
+def write_boards(stream: IO[bytes], boards: Iterable[CodenamesBoard]) -> None:
+    """
+    Write many boards to a binary stream in one write, each encoded with
+    `CodenamesBoard.to_bytes` and prefixed with its 16-bit length. A board
+    whose encoding doesn't fit in that length raises a ValueError.
+    """
+    buffer = bytearray()
+    for board in boards:
+        record = board.to_bytes()
+        if len(record) > 0xFFFF:
+            raise ValueError("Can't write a board that encodes to %d bytes" % len(record))
+        buffer += struct.pack('<H', len(record))
+        buffer += record
+    stream.write(buffer)
+
+
+def read_boards(stream: IO[bytes]) -> Iterator[CodenamesBoard]:
+    """
+    Read the boards written by `write_boards` from a binary stream.
+    """
+    while True:
+        header = stream.read(2)
+        if not header:
+            return
+        length, = struct.unpack('<H', header)
+        yield CodenamesBoard.from_bytes(stream.read(length))
+
 
 class Channel:
     def notify(self, tag, value):
@@ -138,6 +396,17 @@ class Channel:
         raise NotImplementedError
 
 
+class NullChannel(Channel):
+    """
+    A channel that ignores everything it's told.
+    """
+    def notify(self, tag, speaker, value):
+        pass
+
+    def await_input(self, prompt):
+        raise RuntimeError("Nobody is listening to this channel")
+
+
 class Player:
     def __init__(self, team: Team, channel: Channel):
         self.team = team
@@ -145,13 +414,25 @@ class Player:
 
 
 class Spymaster(Player):
-    pass
+    def end_game(self, board: CodenamesBoard) -> None:
+        """
+        Called when a game on `board` ends, so the spymaster can forget
+        what it kept about the board.
+        """
+        pass
 
 
 class Guesser(Player):
-    pass
+    def receive_clue(self, clue_number: int, clue_word: str) -> None:
+        """
+        Called with each clue from this guesser's spymaster, before its
+        guesses. Guessers that follow the game through their channel, like
+        human players, can ignore it.
+        """
+        pass
 
 
+@lru_cache(maxsize=65536)
 def tag_en(word):
     return standardized_uri('en', word)
 
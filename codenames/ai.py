@@ -1,59 +1,115 @@
+import itertools
+import operator
+import threading
+import weakref
+from typing import Callable, List, Optional, Sequence, Tuple
+
 import numpy as np
-import pandas as pd
-import wordfreq
-from conceptnet5.vectors import standardized_uri
-from conceptnet5.vectors.formats import load_hdf
-from conceptnet5.vectors.query import VectorSpaceWrapper
-from conceptnet5.vectors.transforms import l2_normalize_rows
-from pkg_resources import resource_filename
 from scipy.special import erf
 
 from codenames import (
-    tag_en, untag_en, CodenamesBoard, Spymaster
+    tag_en, untag_en, CodenamesBoard, Spymaster, Guesser, WORDLIST
 )
+from codenames.ann import ClusterIndex, load_index as _load_index
+from codenames.endgame import position_values
+from codenames.instrument import NO_STATS, ClueStats
+from codenames.legality import cached_forms_of
+from codenames.vectors import ClueVectors, SimilarityCache, load_vectors as _load_vectors
 
-POSITION_VALUES = np.ones(shape=(10, 10), dtype='f')
-POSITION_VALUES[0, :] = 1.
-POSITION_VALUES[1, :] = .99
-POSITION_VALUES[:, 0] = 0.
-for isum in range(3, 19):
-    for ours in range(1, min(10, isum)):
-        theirs = isum - ours
-        if theirs >= 10:
-            continue
-        POSITION_VALUES[ours, theirs] = 1 - min(
-            (POSITION_VALUES[theirs, ours - 1] * .99 +
-             POSITION_VALUES[theirs, ours] * .01),
-            (POSITION_VALUES[theirs, max(ours - 2, 0)] * .5 +
-             POSITION_VALUES[theirs, ours - 1] * .3 +
-             POSITION_VALUES[theirs, ours] * .2),
-            (POSITION_VALUES[theirs, max(ours - 3, 0)] * .1 +
-             POSITION_VALUES[theirs, max(ours - 2, 0)] * .4 +
-             POSITION_VALUES[theirs, ours - 1] * .4 +
-             POSITION_VALUES[theirs, ours] * .1)
-        )
+# How many board words to cache the similarity of, unless warm_up() is
+# asked to precompute the whole word list
+SIMILARITY_CACHE_COLUMNS = 128
 
+_vectors = None
+_similarity_cache = None
+_cluster_index = None
+_vectors_lock = threading.Lock()
 
-def _load_vectors():
-    frame = load_hdf(resource_filename('codenames', 'data/mini.h5'))
-    selections = [
-        label for label in frame.index
-        if label.startswith('/c/en/') and '_' not in label and '#' not in label
-        and wordfreq.zipf_frequency(label[6:], 'en') > 3.0
-    ]
-    # Make sure all the words in Codenames are represented
-    wordlist = [
-        standardized_uri('en', line.strip()) for line in open(
-            resource_filename('codenames', 'data/codenames-words.txt')
-        )
-        ]
-    additions = [word for word in wordlist if word not in selections]
-    selections += additions
-    frame = l2_normalize_rows(frame.loc[selections].astype('f'))
-    return VectorSpaceWrapper(frame=frame)
 
+def get_vectors() -> ClueVectors:
+    """
+    Get the clue vectors, loading them the first time they're needed.
+
+    Importing this module doesn't load anything, so code that never asks an
+    AI for a clue never pays for the vectors.
+    """
+    global _vectors
+    if _vectors is None:
+        with _vectors_lock:
+            if _vectors is None:
+                _vectors = _load_vectors()
+    return _vectors
+
+
+def set_vectors(vectors: ClueVectors):
+    """
+    Use `vectors` as the clue vectors from now on, such as vectors attached
+    from shared memory in a worker process.
+    """
+    global _vectors, _similarity_cache, _cluster_index
+    with _vectors_lock:
+        _vectors = vectors
+        _similarity_cache = None
+        _cluster_index = None
+
+
+def get_similarity_cache() -> SimilarityCache:
+    """
+    Get the cache of similarity columns for board words.
+    """
+    global _similarity_cache
+    if _similarity_cache is None:
+        vectors = get_vectors()
+        with _vectors_lock:
+            if _similarity_cache is None:
+                _similarity_cache = SimilarityCache(vectors, SIMILARITY_CACHE_COLUMNS)
+    return _similarity_cache
+
+
+def get_cluster_index() -> ClusterIndex:
+    """
+    Get the approximate nearest-neighbor index of the clue vectors, for
+    `ShortlistSpymaster`.
+    """
+    global _cluster_index
+    if _cluster_index is None:
+        vectors = get_vectors()
+        with _vectors_lock:
+            if _cluster_index is None:
+                _cluster_index = _load_index(vectors)
+    return _cluster_index
+
+
+def warm_up(precompute_similarity=False):
+    """
+    Load the clue vectors now, and read through them once so that a
+    memory-mapped store is paged in, instead of making the first clue of
+    the first game wait for it. Servers should call this before they start
+    accepting games.
+
+    With `precompute_similarity=True`, also compute the similarity of the
+    vocabulary to every word in `WORDLIST`, so that no board built from it
+    needs a matrix product. This takes 4 * V * len(WORDLIST) bytes.
+    """
+    global _similarity_cache
+    vectors = get_vectors()
+    np.sum(vectors.matrix, axis=0)
+    if precompute_similarity:
+        labels = [tag_en(word) for word in WORDLIST]
+        cache = SimilarityCache(vectors, len(labels))
+        cache.precompute(labels)
+        _similarity_cache = cache
 
-VECTORS = _load_vectors()
+
+def __getattr__(name):
+    # `VECTORS` and `POSITION_VALUES` used to be computed when this module
+    # was imported. Keep them available as attributes that are computed on
+    # first use.
+    if name == 'VECTORS':
+        return get_vectors()
+    elif name == 'POSITION_VALUES':
+        return position_values()
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
 
 class DummySpymaster(Spymaster):
@@ -65,86 +121,572 @@ class DummySpymaster(Spymaster):
 
 
 class AISpymaster(Spymaster):
-    def __init__(self, team, channel):
+    # How many of the best legal clues to score for each number of words
+    # clued
+    candidates_per_count = 100
+    # How many boards to keep a BoardState for, dropping the oldest first.
+    # Each one holds several V x C float32 matrices.
+    max_board_states = 4
+
+    def __init__(self, team, channel, stats_hook: Callable[[ClueStats], None] = None):
+        """
+        If `stats_hook` is given, it's called with a `ClueStats` after each
+        clue, saying how long each stage took; see `codenames.instrument`.
+        """
         self.clued = set()
+        # What we've worked out about each board we're giving clues on
+        self.board_states = weakref.WeakKeyDictionary()
+        self.stats_hook = stats_hook
         super().__init__(team, channel)
 
     def name(self):
         return "%s AI spymaster" % self.team.name.title()
 
     def get_clue(self, board: CodenamesBoard) -> (int, str):
+        stats = NO_STATS if self.stats_hook is None else ClueStats()
+        vectors = get_vectors()
+        state = self.board_states.get(board)
+        if state is None or state.vectors is not vectors or not state.update(board, stats):
+            state = self._board_state(vectors, board, stats)
+            self.board_states.pop(board, None)
+            while len(self.board_states) >= self.max_board_states:
+                del self.board_states[next(iter(self.board_states))]
+            self.board_states[board] = state
+
+        with stats.stage('combine'):
+            combined_probs = state.combined_probs()
+        with stats.stage('legality'):
+            legal = state.legal_clues(self.clued)
+        with stats.stage('rank'):
+            prob_values = top_probabilities(combined_probs)
+            products = np.cumprod(prob_values, axis=1)
+            if stats.enabled:
+                illegal_products = products[~legal]
+            ranked_clues = rank_products(products, self.candidates_per_count, legal)
+        with stats.stage('choose'):
+            choices = _clue_choices(state.words, prob_values, combined_probs, ranked_clues,
+                                    state.good_vocab)
+            clue = self._choose_clue(board, choices)
+
+        if stats.enabled:
+            stats.count('vocabulary', len(legal))
+            stats.count('legal', int(np.count_nonzero(legal)))
+            stats.count('candidates', sum(len(indices) for indices in ranked_clues))
+            for col, indices in enumerate(ranked_clues):
+                # Count the illegal clues that would have made the cut
+                cutoff = -1.
+                if len(indices) == self.candidates_per_count:
+                    cutoff = products[indices[-1], col]
+                stats.rejections.append(int(np.count_nonzero(illegal_products[:, col] >= cutoff)))
+            stats.clue = clue
+            self.stats_hook(stats)
+        return clue
+
+    def end_game(self, board: CodenamesBoard) -> None:
+        self.board_states.pop(board, None)
+
+    def _board_state(self, vectors: ClueVectors, board: CodenamesBoard,
+                     stats=NO_STATS) -> 'BoardState':
+        return BoardState(vectors, board, self.team, stats=stats)
+
+    @staticmethod
+    def get_clues(requests: Sequence[Tuple['AISpymaster', CodenamesBoard]]) -> List[Tuple[int, str]]:
+        """
+        Get clues for many games at once. Each request is a spymaster and the
+        board it's giving a clue for, and the result is what each spymaster's
+        `get_clue` would have returned.
+
+        Instead of a V x C matrix product per board, this computes the
+        similarity of the vocabulary to every distinct word on any of the
+        boards in one product, and computes the probabilities for all the
+        boards together, in a V x B x C layout. That layout takes 4 * V * B * C
+        bytes, so very large batches should be split up.
+
+        Only plain AISpymasters with no stats hook, on boards they haven't
+        given a clue on yet, are batched. Other requests, such as from a
+        ShortlistSpymaster or a spymaster that can update the state it kept
+        from its last turn, are passed to their spymaster's `get_clue`.
+        """
+        clues = [None] * len(requests)
+        batch = []
+        for i, (spymaster, board) in enumerate(requests):
+            if spymaster._can_batch(board):
+                batch.append(i)
+            else:
+                clues[i] = spymaster.get_clue(board)
+        if batch:
+            batch_clues = AISpymaster._get_clues_batched([requests[i] for i in batch])
+            for i, clue in zip(batch, batch_clues):
+                clues[i] = clue
+        return clues
+
+    def _can_batch(self, board: CodenamesBoard) -> bool:
+        cls = type(self)
+        return (
+            cls.get_clue is AISpymaster.get_clue and cls._board_state is AISpymaster._board_state
+            and self.stats_hook is None and board not in self.board_states
+        )
+
+    @staticmethod
+    def _get_clues_batched(requests: Sequence[Tuple['AISpymaster', CodenamesBoard]]) -> List[Tuple[int, str]]:
+        vectors = get_vectors()
+        vocabs = []
+        value_rows = []
+        for spymaster, board in requests:
+            unrevealed = board.unrevealed_items()
+            vocabs.append([tag_en(word) for (word, team) in unrevealed])
+            value_rows.append([team.value_for_team(spymaster.team) for (word, team) in unrevealed])
+
+        labels = list(dict.fromkeys(itertools.chain.from_iterable(vocabs)))
+        label_columns = {label: col for (col, label) in enumerate(labels)}
+        sims = vectors.similarity(labels)
+
+        # Lay the boards out side by side, padding short ones with columns
+        # whose value of 0 means they're never counted
+        width = max(len(vocab) for vocab in vocabs)
+        columns = np.zeros((len(requests), width), dtype=int)
+        values = np.zeros((len(requests), width), dtype=int)
+        for i, (vocab, value_row) in enumerate(zip(vocabs, value_rows)):
+            columns[i, :len(vocab)] = [label_columns[label] for label in vocab]
+            values[i, :len(vocab)] = value_row
+
+        combined_probs = clue_probabilities(sims[:, columns], values)
+        good_cols, good_valid = good_columns(values)
+        prob_values = top_probabilities(combined_probs)
+        products = np.cumprod(prob_values, axis=-1)
+
+        clues = []
+        for i, (spymaster, board) in enumerate(requests):
+            ngood = int(good_valid[i].sum())
+            good_vocab = [vocabs[i][col] for col in good_cols[i, :ngood]]
+            legal = board.clue_mask(vectors.clue_words, exclude=spymaster.clued)
+            ranked_clues = rank_products(
+                products[:, i, :ngood], spymaster.candidates_per_count, legal
+            )
+            choices = _clue_choices(
+                vectors.words, prob_values[:, i], combined_probs[:, i, :ngood],
+                ranked_clues, good_vocab
+            )
+            clues.append(spymaster._choose_clue(board, choices))
+        return clues
+
+    def _choose_clue(self, board: CodenamesBoard, choices) -> (int, str):
+        """
+        Give the clue with the best expected value out of the `choices` from
+        `solve_clue`.
+        """
         scores = board.scores()
         my_score = scores[self.team]
         their_score = scores[self.team.opponent()]
 
-        unrevealed = board.unrevealed_items()
-        board_vocab = [tag_en(word) for (word, team) in unrevealed]
-        simframe = VECTORS.frame.dot(VECTORS.frame.reindex(board_vocab).T)
-        values = pd.Series(
-            [team.value_for_team(self.team) for (word, team) in unrevealed],
-            index=board_vocab
-        )
         best = (0, 'dunno', 0., None)
-        for nclued, clue, probs, explanation in self.solve_clue(board, simframe, values):
-            if clue in self.clued:
-                continue
-            prob_left = 1.
-            ev = 0.
-            for idx, prob in enumerate(probs):
-                prob_fail = 1. - prob
-                opp_ev = POSITION_VALUES[their_score - 1, my_score - idx] * 0.5 + POSITION_VALUES[their_score, my_score - idx] * 0.4 + 0.1
-                ev += prob_left * prob_fail * (1. - opp_ev)
-                prob_left *= prob
-            ev += prob_left * (1. - POSITION_VALUES[their_score, my_score - nclued])
-            if ev > best[2]:
-                best = (nclued, clue, ev, explanation)
+        for nclued, group in itertools.groupby(choices, key=operator.itemgetter(0)):
+            group = list(group)
+            evs = expected_values(np.array([probs for (_, _, probs, _) in group]), my_score, their_score)
+            choice = np.argmax(evs)
+            if evs[choice] > best[2]:
+                _, clue, _, explanation = group[choice]
+                best = (nclued, clue, evs[choice], explanation)
         nclued, clue, ev, explanation = best
         if explanation is not None:
             describe_pieces = [
                 "%s (%d%%)" % (untag_en(cn_term), prob * 100)
-                for (cn_term, prob) in explanation[::-1].items()
+                for (cn_term, prob) in explanation
             ]
             description = ", ".join(describe_pieces)
             self.channel.notify('notify', self.name(), "%s %d -> %s" % (clue, nclued, description))
         self.clued.add(clue)
         return (nclued, clue)
 
-    def solve_clue(self, board: CodenamesBoard, simframe: pd.DataFrame, values: pd.Series):
+    def solve_clue(self, board: CodenamesBoard, simframe: np.ndarray, values: np.ndarray,
+                   board_vocab: List[str]):
         """
         `simframe` is a V x C matrix, where V is the vocabulary size and C is the
         number of unrevealed words on the board, containing the similarity of all
         cluable words to the board.
 
-        `values` is a vector of payoffs for the unrevealed words on the board.
-        """
-        neu_max = np.max(simframe.ix[:, values < 0], axis=1)
-        neg_max = np.max(simframe.ix[:, values <= -2], axis=1)
-        ded_max = np.max(simframe.ix[:, values <= -3], axis=1)
-        neu_probs = margin_prob((simframe.T - neu_max).T).ix[:, values > 0]
-        neg_probs = margin_prob((simframe.T - neg_max).T).ix[:, values > 0]
-        ded_probs = margin_prob((simframe.T - ded_max).T).ix[:, values > 0]
-
-        combined_probs = (neu_probs * neu_probs * (neg_probs * ded_probs) ** 0.5).fillna(0)
-
-        prob_values = np.sort(combined_probs.values)[:, ::-1][:, :9]
-        prob_frame = pd.DataFrame(prob_values, index=simframe.index)
-        products = pd.DataFrame(np.cumprod(prob_values, axis=1), index=simframe.index)
-
-        clue_choices = []
-        for nclued in range(1, min(10, products.shape[1] + 1)):
-            possible_clues = products[nclued - 1].nlargest(50)
-            for clue in possible_clues.index:
-                word = untag_en(clue)
-                if board.clue_is_ok(word):
-                    probs = prob_frame.loc[clue, 0:(nclued - 1)]
-                    min_prob = prob_frame.loc[clue, nclued - 1]
-                    row = combined_probs.loc[clue]
-                    explanation = row[row >= min_prob].sort_values()
-                    clue_choices.append((nclued, word, probs, explanation))
-                    break
-        return clue_choices
-
-
-def margin_prob(margin):
-    balance = erf(margin / .18)
-    return balance / 2 + 0.5
+        `values` is a vector of payoffs for the unrevealed words on the board,
+        and `board_vocab` contains their ConceptNet URIs.
+
+        Only legal clues that haven't been given already are considered.
+        Returns a list of `(nclued, word, probs, explanation)` tuples, ordered
+        by `nclued`, with up to `candidates_per_count` clues for each
+        `nclued`, best first. `explanation` lists the `(uri, prob)`
+        pairs for the words on the board that the clue is meant to indicate,
+        most likely first.
+        """
+        vectors = get_vectors()
+        good_vocab = [term for (term, value) in zip(board_vocab, values) if value > 0]
+        legal = board.clue_mask(vectors.clue_words, exclude=self.clued)
+        combined_probs = clue_probabilities(simframe, values)
+        prob_values, ranked_clues = rank_clues(combined_probs, self.candidates_per_count, legal)
+        return _clue_choices(vectors.words, prob_values, combined_probs, ranked_clues, good_vocab)
+
+
+class ShortlistSpymaster(AISpymaster):
+    """
+    An AISpymaster that only considers the clues near its team's words,
+    found with the approximate nearest-neighbor index from `codenames.ann`,
+    instead of scoring the whole vocabulary. This is for vocabularies too
+    large to score exhaustively; on a small one, it gives nearly the same
+    clues as AISpymaster.
+
+    The shortlist is chosen on the first turn of each board. Our words are
+    only ever removed after that, so it still covers the ones that are left.
+    """
+    # How many clues to shortlist near each of our words, and how many
+    # clusters to search for them
+    shortlist_per_word = 200
+    nprobe = 8
+
+    def name(self):
+        return "%s shortlist AI spymaster" % self.team.name.title()
+
+    def _board_state(self, vectors: ClueVectors, board: CodenamesBoard,
+                     stats=NO_STATS) -> 'BoardState':
+        good_labels = [
+            tag_en(word) for (word, value) in board.unrevealed_items()
+            if value.value_for_team(self.team) > 0
+        ]
+        with stats.stage('shortlist'):
+            rows = get_cluster_index().candidates(
+                vectors, vectors.vectors_for(good_labels), self.shortlist_per_word, self.nprobe
+            )
+        return BoardState(vectors, board, self.team, rows, stats)
+
+
+class BoardState:
+    """
+    The parts of a spymaster's reasoning about a board that carry over from
+    turn to turn: the similarity of the vocabulary to each unrevealed word,
+    the margin probabilities against the best neutral-or-worse,
+    opposing-or-worse and assassin words, and which clues are legal.
+
+    A turn only reveals a few words, so `update` only drops their columns,
+    and only recomputes the margin probabilities for the categories whose
+    maximum similarity could have changed.
+
+    If `rows` is given, only those rows of the vocabulary are considered,
+    and the matrices and masks here have a row for each of them.
+    """
+    # Each factor of the combined probability compares our words to the most
+    # similar word with at most this value, raised to this power
+    FACTORS = [(-1, 2.), (-2, .5), (-3, .5)]
+
+    def __init__(self, vectors: ClueVectors, board: CodenamesBoard, team,
+                 rows: np.ndarray = None, stats=NO_STATS):
+        self.vectors = vectors
+        unrevealed = board.unrevealed_items()
+        values = np.array([value.value_for_team(team) for (word, value) in unrevealed])
+        good = values > 0
+        board_vocab = [tag_en(word) for (word, value) in unrevealed]
+        with stats.stage('similarity'):
+            if rows is None:
+                self.words = vectors.words
+                self.clue_words = vectors.clue_words
+                sims = get_similarity_cache().similarity(board_vocab)
+            else:
+                self.words = vectors.words[rows]
+                self.clue_words = vectors.clue_words[rows]
+                sims = vectors.rows(rows) @ vectors.vectors_for(board_vocab).T
+
+        self.good_words = [word for ((word, _), is_good) in zip(unrevealed, good) if is_good]
+        self.good_vocab = [tag_en(word) for word in self.good_words]
+        self.good_sims = np.ascontiguousarray(sims[:, good], dtype=np.float32)
+        self.bad_words = [word for ((word, _), is_good) in zip(unrevealed, good) if not is_good]
+        self.bad_values = values[~good]
+        self.bad_sims = np.ascontiguousarray(sims[:, ~good], dtype=np.float32)
+        with stats.stage('legality'):
+            misses = cached_forms_of.cache_info().misses
+            self.legal = board.clue_mask(self.clue_words)
+            # Only approximate if other threads are checking clues too
+            stats.count('legality_queries', cached_forms_of.cache_info().misses - misses)
+        with stats.stage('margin_probs'):
+            self.factors = [self._factor(threshold, power) for (threshold, power) in self.FACTORS]
+
+    def _factor(self, threshold: int, power: float) -> np.ndarray:
+        factor = np.empty_like(self.good_sims)
+        _margin_probs(self.good_sims, _row_max(self.bad_sims, self.bad_values <= threshold), out=factor)
+        return np.power(factor, power, out=factor)
+
+    def update(self, board: CodenamesBoard, stats=NO_STATS) -> bool:
+        """
+        Catch up with the words revealed on `board` since the last update.
+        Returns False if the board doesn't match this state, such as if
+        words have been un-revealed, and it has to be built again.
+        """
+        valid = board.valid_guesses()
+        if not valid <= set(self.good_words).union(self.bad_words):
+            return False
+
+        keep = np.array([word in valid for word in self.good_words], dtype=bool)
+        if not keep.all():
+            self.good_words = [word for (word, kept) in zip(self.good_words, keep) if kept]
+            self.good_vocab = [term for (term, kept) in zip(self.good_vocab, keep) if kept]
+            self.good_sims = self.good_sims[:, keep]
+            self.factors = [factor[:, keep] for factor in self.factors]
+
+        keep = np.array([word in valid for word in self.bad_words], dtype=bool)
+        if not keep.all():
+            revealed_values = self.bad_values[~keep]
+            self.bad_words = [word for (word, kept) in zip(self.bad_words, keep) if kept]
+            self.bad_values = self.bad_values[keep]
+            self.bad_sims = self.bad_sims[:, keep]
+            with stats.stage('margin_probs'):
+                for i, (threshold, power) in enumerate(self.FACTORS):
+                    if (revealed_values <= threshold).any():
+                        self.factors[i] = self._factor(threshold, power)
+        return True
+
+    def combined_probs(self) -> np.ndarray:
+        """
+        Get the same V x G matrix as `clue_probabilities`.
+        """
+        combined = self.factors[0].copy()
+        for factor in self.factors[1:]:
+            combined *= factor
+        return combined
+
+    def legal_clues(self, clued) -> np.ndarray:
+        """
+        Get the mask of legal clues, excluding the ones in `clued`.
+        """
+        if not clued:
+            return self.legal
+        return self.legal & ~np.isin(self.clue_words, [clue.upper() for clue in clued])
+
+
+def _clue_choices(words: np.ndarray, prob_values: np.ndarray, combined_probs: np.ndarray,
+                  ranked_clues: List[np.ndarray], good_vocab: List[str]):
+    """
+    Describe the ranked clues as the list of tuples that `solve_clue` returns.
+    `words` are the clue words of the rows of `prob_values` and
+    `combined_probs`.
+    """
+    clue_choices = []
+    for nclued, possible_clues in enumerate(ranked_clues, start=1):
+        for clue_idx in possible_clues:
+            word = str(words[clue_idx])
+            probs = prob_values[clue_idx, :nclued]
+            min_prob = prob_values[clue_idx, nclued - 1]
+            row = combined_probs[clue_idx]
+            explanation = [
+                (good_vocab[col], row[col])
+                for col in np.argsort(-row, kind='stable')
+                if row[col] >= min_prob
+            ]
+            clue_choices.append((nclued, word, probs, explanation))
+    return clue_choices
+
+
+class AIGuesser(Guesser):
+    """
+    Guesses the unrevealed words most similar to the clue, one per word the
+    clue is for, and then passes.
+
+    The board is ranked against the clue once per turn, on the first guess,
+    and later guesses in the turn take the best of that ranking that's still
+    unrevealed.
+    """
+    def __init__(self, team, channel):
+        self.clue = None
+        self.guesses_left = 0
+        self.ranking = None
+        super().__init__(team, channel)
+
+    def name(self):
+        return "%s AI guesser" % self.team.name.title()
+
+    def receive_clue(self, clue_number: int, clue_word: str) -> None:
+        self.clue = clue_word
+        self.guesses_left = clue_number
+        self.ranking = None
+
+    def rank_words(self, words: List[str]) -> List[str]:
+        """
+        Sort `words` by their similarity to the clue, most similar first,
+        breaking ties alphabetically.
+        """
+        vectors = get_vectors()
+        words = sorted(words)
+        clue_vector = vectors.vectors_for([tag_en(self.clue)])[0]
+        sims = vectors.vectors_for([tag_en(word) for word in words]) @ clue_vector
+        return [words[i] for i in np.argsort(-sims, kind='stable')]
+
+    def get_guess(self, board: CodenamesBoard) -> Optional[str]:
+        if self.guesses_left <= 0:
+            return None
+        valid = board.valid_guesses()
+        if self.ranking is None or not valid <= set(self.ranking):
+            self.ranking = self.rank_words(valid)
+        self.guesses_left -= 1
+        return next(word for word in self.ranking if word in valid)
+
+
+def expected_values(probs: np.ndarray, my_score: int, their_score: int) -> np.ndarray:
+    """
+    Score K clues that each try for n words, given a K x n matrix of the
+    probability of each word being guessed in turn.
+
+    A clue's value is our chance of winning after the turn: if the guesser
+    gets the first i words and then misses, the opponent moves in the position
+    where we've scored i, and if they get all n, the opponent moves with n
+    fewer of our words left.
+    """
+    values = position_values(max(my_score, their_score) + 1)
+    nclued = probs.shape[1]
+    idx = np.arange(nclued)
+    opp_ev = (
+        values[their_score - 1, my_score - idx] * 0.5
+        + values[their_score, my_score - idx] * 0.4
+        + 0.1
+    )
+    # prob_left[:, i] is the probability of getting the first i words right
+    prob_left = np.ones((probs.shape[0], nclued + 1), dtype=probs.dtype)
+    np.cumprod(probs, axis=1, out=prob_left[:, 1:])
+    evs = (prob_left[:, :-1] * (1. - probs)) @ (1. - opp_ev)
+    evs += prob_left[:, -1] * (1. - values[their_score, my_score - nclued])
+    return evs
+
+
+def _row_max(simframe: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    Get the maximum of each row of `simframe` over the columns (on its last
+    axis) selected by the boolean `mask`, or -inf if no columns are selected.
+    """
+    return np.max(simframe, axis=-1, initial=-np.inf, where=mask)
+
+
+def _margin_probs(good_sims: np.ndarray, threshold: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """
+    Fill `out` with the probability that each of our words beats the
+    corresponding row of `threshold`.
+    """
+    np.subtract(good_sims, threshold[..., np.newaxis], out=out)
+    return margin_prob(out, out=out)
+
+
+def good_columns(values: np.ndarray):
+    """
+    Find the columns of our team's words, given the payoffs `values` for one
+    board (a vector) or for several (a B x C matrix).
+
+    Returns `(columns, valid)`. `columns` holds the indices of each board's
+    positive-valued columns, in order, padded to the same length G for every
+    board, and `valid` is a boolean array that's False for the padding.
+    """
+    good = values > 0
+    ngood = int(np.max(np.sum(good, axis=-1), initial=0))
+    columns = np.argsort(~good, axis=-1, kind='stable')[..., :ngood]
+    return columns, np.take_along_axis(good, columns, axis=-1)
+
+
+def clue_probabilities(simframe: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Get a V x G matrix, where G is the number of our team's words among the
+    columns of `simframe`, of the probability that each clue leads the
+    guesser to each of our words instead of a neutral, opposing, or assassin
+    word.
+
+    This is the product `neu * neu * sqrt(neg * ded)` of the margin
+    probabilities against the most similar neutral-or-worse word,
+    opposing-or-worse word, and the assassin. It's computed in two V x G
+    buffers, without materializing any V x C intermediate.
+
+    This also works on several boards at once, given a V x B x C `simframe`
+    and B x C `values`. Columns with a value of 0 are ignored, so boards
+    can be padded to the same width. The result is V x B x G, where G is the
+    most good words on any board, and padding columns have a probability of
+    0.
+    """
+    columns, valid = good_columns(values)
+    good_sims = np.take_along_axis(simframe, columns[np.newaxis], axis=-1)
+    combined = np.empty_like(good_sims)
+    scratch = np.empty_like(good_sims)
+
+    _margin_probs(good_sims, _row_max(simframe, values < 0), out=combined)
+    combined *= combined
+
+    _margin_probs(good_sims, _row_max(simframe, values <= -2), out=scratch)
+    np.sqrt(scratch, out=scratch)
+    combined *= scratch
+
+    _margin_probs(good_sims, _row_max(simframe, values <= -3), out=scratch)
+    np.sqrt(scratch, out=scratch)
+    combined *= scratch
+
+    if not valid.all():
+        combined[:, ~valid] = 0.
+    return combined
+
+
+def top_probabilities(combined_probs: np.ndarray, k: int = 9) -> np.ndarray:
+    """
+    Get the `k` largest values along the last axis of `combined_probs`, in
+    descending order. Only the selected values are sorted.
+    """
+    ncols = combined_probs.shape[-1]
+    if ncols > k:
+        combined_probs = np.partition(combined_probs, ncols - k, axis=-1)[..., ncols - k:]
+    return np.sort(combined_probs, axis=-1)[..., ::-1]
+
+
+def top_indices(scores: np.ndarray, n: int) -> np.ndarray:
+    """
+    Get the indices of the `n` largest `scores`, largest first, breaking ties
+    in favor of the lower index.
+    """
+    if n < len(scores):
+        # Select by value, so that ties at the cutoff go to the lowest indices
+        cutoff = -np.partition(-scores, n - 1)[n - 1]
+        above = np.flatnonzero(scores > cutoff)
+        tied = np.flatnonzero(scores == cutoff)[:n - len(above)]
+        indices = np.concatenate([above, tied])
+    else:
+        indices = np.arange(len(scores))
+    return indices[np.lexsort((indices, -scores[indices]))]
+
+
+def rank_clues(combined_probs: np.ndarray, ncandidates: int = 50, legal: np.ndarray = None):
+    """
+    Rank the clues, given the V x G matrix from `clue_probabilities`.
+
+    Returns `(prob_values, ranked)`. `prob_values` is a V x k matrix of each
+    clue's top k <= 9 probabilities in descending order. `ranked` is the
+    result of `rank_products` on their cumulative products.
+    """
+    prob_values = top_probabilities(combined_probs)
+    products = np.cumprod(prob_values, axis=1)
+    return prob_values, rank_products(products, ncandidates, legal)
+
+
+def rank_products(products: np.ndarray, ncandidates: int = 50, legal: np.ndarray = None):
+    """
+    Given a V x n matrix of the probability of each clue getting its first
+    1, 2, ..., n words guessed, return a list where `ranked[n - 1]` holds the
+    indices of the `ncandidates` clues with the best chance of getting n
+    words, best first. If a boolean mask of `legal` clues is given, only
+    those clues are ranked, and illegal rows of `products` are overwritten.
+    """
+    if legal is not None:
+        # Probabilities are never negative, so this puts illegal clues last
+        products[~legal] = -1.
+    ranked = []
+    for col in range(products.shape[1]):
+        indices = top_indices(products[:, col], ncandidates)
+        if legal is not None:
+            indices = indices[legal[indices]]
+        ranked.append(indices)
+    return ranked
+
+
+def margin_prob(margin, out=None):
+    """
+    Convert a margin of similarity into a probability, as the CDF of a
+    normal distribution. Pass `out=margin` to compute it in place.
+    """
+    balance = np.divide(margin, .18, out=out)
+    erf(balance, out=balance)
+    balance /= 2
+    balance += 0.5
+    return balance
@@ -0,0 +1,168 @@
+"""
+An approximate nearest-neighbor index over the clue vectors, for choosing
+clues from a vocabulary too large to score exhaustively.
+
+The index is an inverted file: the vocabulary is split into clusters by
+spherical k-means, and each cluster's rows are stored together. A query
+only scores the rows of the few clusters whose centroids are most similar
+to it. `ShortlistSpymaster` uses it to find the clues near each of its
+team's words, and only runs the full probability calculation on those.
+
+To rebuild the index after rebuilding the vector store, run:
+
+    python -m codenames.ann
+"""
+import os
+import warnings
+
+import numpy as np
+from pkg_resources import resource_filename
+
+from codenames.storage import atomic_write
+from codenames.vectors import ClueVectors, load_vectors
+
+INDEX_FILENAME = resource_filename('codenames', 'data/clue-clusters.npz')
+
+# How many rows to compare to the centroids at a time while clustering
+BLOCK_ROWS = 65536
+
+
+class ClusterIndex:
+    """
+    Clusters of rows of a V x D matrix. `centroids` is a K x D matrix of
+    normalized cluster centers, and the rows in cluster `k` are
+    `order[offsets[k]:offsets[k + 1]]`.
+    """
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray):
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+
+    @property
+    def nrows(self) -> int:
+        return len(self.order)
+
+    @classmethod
+    def build(cls, vectors: ClueVectors, nclusters: int = None, iterations: int = 10,
+              seed: int = 0) -> 'ClusterIndex':
+        """
+        Cluster the vectors by spherical k-means. By default there are about
+        4 * sqrt(V) clusters.
+        """
+        nrows = vectors.matrix.shape[0]
+        if nclusters is None:
+            nclusters = int(4 * np.sqrt(nrows))
+        nclusters = max(1, min(nclusters, nrows))
+        rng = np.random.default_rng(seed)
+        centroids = vectors.rows(np.sort(rng.choice(nrows, nclusters, replace=False)))
+        for _ in range(iterations):
+            assignments = _assign(vectors, centroids)
+            sums = np.zeros_like(centroids)
+            for start in range(0, nrows, BLOCK_ROWS):
+                np.add.at(sums, assignments[start:start + BLOCK_ROWS],
+                          vectors.rows(slice(start, start + BLOCK_ROWS)))
+            norms = np.linalg.norm(sums, axis=1)
+            empty = norms == 0
+            # Restart empty clusters from random rows
+            restarts = rng.choice(nrows, int(empty.sum()), replace=False)
+            sums[empty] = vectors.rows(np.sort(restarts))
+            norms[empty] = 1.
+            centroids = sums / norms[:, np.newaxis]
+        assignments = _assign(vectors, centroids)
+        order = np.argsort(assignments, kind='stable')
+        offsets = np.searchsorted(assignments[order], np.arange(nclusters + 1))
+        return cls(centroids, order, offsets)
+
+    def candidates(self, vectors: ClueVectors, queries: np.ndarray, per_query: int = 200,
+                   nprobe: int = 8) -> np.ndarray:
+        """
+        Find roughly the `per_query` rows of `vectors` most similar to each
+        row of the Q x D matrix `queries`, by only scoring the rows of the
+        `nprobe` clusters nearest to each query. Returns the union of what
+        was found as sorted row indices.
+        """
+        nprobe = min(nprobe, len(self.centroids))
+        centroid_sims = queries @ self.centroids.T
+        probes = np.argpartition(-centroid_sims, nprobe - 1, axis=1)[:, :nprobe]
+        found = []
+        for query, clusters in zip(queries, probes):
+            rows = np.concatenate([
+                self.order[self.offsets[k]:self.offsets[k + 1]] for k in clusters
+            ])
+            if len(rows) > per_query:
+                sims = vectors.rows(rows) @ query
+                rows = rows[np.argpartition(-sims, per_query - 1)[:per_query]]
+            found.append(rows)
+        return np.unique(np.concatenate(found))
+
+    def save(self, filename=INDEX_FILENAME):
+        """
+        Save the index, replacing any existing file atomically, so that
+        processes saving it at the same time can't corrupt it.
+        """
+        with atomic_write(filename, suffix='.tmp.npz') as out:
+            np.savez(out, centroids=self.centroids, order=self.order, offsets=self.offsets)
+
+    @classmethod
+    def load(cls, filename=INDEX_FILENAME) -> 'ClusterIndex':
+        with np.load(filename) as data:
+            return cls(data['centroids'], data['order'], data['offsets'])
+
+
+def _assign(vectors: ClueVectors, centroids: np.ndarray) -> np.ndarray:
+    """
+    Find the most similar centroid to each of the vectors.
+    """
+    nrows = vectors.matrix.shape[0]
+    assignments = np.empty(nrows, dtype=np.intp)
+    for start in range(0, nrows, BLOCK_ROWS):
+        block = vectors.rows(slice(start, start + BLOCK_ROWS))
+        assignments[start:start + BLOCK_ROWS] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def index_is_current(vectors: ClueVectors, filename=INDEX_FILENAME) -> bool:
+    """
+    Check that there's a saved index that's newer than the vector store
+    that `vectors` were opened from.
+    """
+    matrix_filename = getattr(vectors.matrix, 'filename', None)
+    if matrix_filename is None:
+        return False
+    try:
+        return os.path.getmtime(filename) >= os.path.getmtime(matrix_filename)
+    except OSError:
+        return False
+
+
+def load_index(vectors: ClueVectors, filename=INDEX_FILENAME) -> ClusterIndex:
+    """
+    Load the saved index for `vectors` if it's up to date, or else build
+    one. If the saved index is missing or older than the vector store, the
+    new one replaces it, so only the first process to notice rebuilds it.
+    (An up-to-date index for a different number of rows, such as when
+    `CODENAMES_MIN_ZIPF` is set, is left alone.)
+    """
+    current = index_is_current(vectors, filename)
+    if current:
+        index = ClusterIndex.load(filename)
+        if index.nrows == vectors.matrix.shape[0]:
+            return index
+    index = ClusterIndex.build(vectors)
+    if not current and getattr(vectors.matrix, 'filename', None) is not None:
+        try:
+            index.save(filename)
+        except OSError as err:
+            warnings.warn(
+                "Couldn't save the rebuilt clue index (%s), so every process will rebuild it; "
+                "run `python -m codenames.ann` where it can be saved" % err
+            )
+    return index
+
+
+def main():
+    ClusterIndex.build(load_vectors()).save()
+
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,7 @@ def justify(word):
 class FileStreamChannel(Channel):
     def __init__(self, stream: IO[str]):
         self.stream = stream
+        self.term = Terminal()
 
     @staticmethod
     def open_filename(filename: str):
@@ -30,14 +31,16 @@ class FileStreamChannel(Channel):
             self.stream.close()
 
     def notify(self, tag: str, speaker: str, value):
-        term = Terminal()
+        term = self.term
         if tag == 'board':
             self.show_board(value)
         elif tag == 'status':
             print('[%s] %s' % (speaker, value), file=self.stream)
         elif tag == 'winner':
-            name = value.name.title()
-            print('%s wins.' % name, file=self.stream)
+            if value is Team.unknown:
+                print('Out of turns; nobody wins.', file=self.stream)
+            else:
+                print('%s wins.' % value.name.title(), file=self.stream)
         elif tag == 'clue':
             number, word = value
             print('[%s] Clue: %s %d' % (speaker, word, number), file=self.stream)
@@ -60,21 +63,24 @@ class FileStreamChannel(Channel):
         self.stream.flush()
 
     def show_board(self, items: List[Tuple[str, Team]]):
-        term = Terminal()
+        # Build the whole board and write it at once
+        term = self.term
+        pieces = []
         for i, (word, team) in enumerate(items):
             jword = word[:11]
             if team is Team.unknown:
-                print(justify(jword), end='', file=self.stream)
+                pieces.append(justify(jword))
             elif team is Team.red:
-                print(term.red(justify(jword + ' [r]')), end='', file=self.stream)
+                pieces.append(term.red(justify(jword + ' [r]')))
             elif team is Team.blue:
-                print(term.blue(justify(jword + ' [b]')), end='', file=self.stream)
+                pieces.append(term.blue(justify(jword + ' [b]')))
             elif team is Team.neutral:
-                print(term.yellow(justify(jword + ' [n]')), end='', file=self.stream)
+                pieces.append(term.yellow(justify(jword + ' [n]')))
             elif team is Team.assassin:
-                print(term.reverse(justify(jword + ' [a]')), end='', file=self.stream)
+                pieces.append(term.reverse(justify(jword + ' [a]')))
             if i % 5 == 4:
-                print('\n', file=self.stream)
+                pieces.append('\n\n')
+        self.stream.write(''.join(pieces))
 
     def await_input(self, prompt: str):
         print(prompt, file=self.stream)
@@ -0,0 +1,145 @@
+"""
+The chance of winning from each position in the race to clue all of your
+team's words, used to weigh risky clues against safe ones.
+
+`position_values(size)[ours, theirs]` is the probability that the team to
+move wins when it has `ours` words left to find and the other team has
+`theirs`, for up to `size - 1` words each. It comes from a model where
+each turn, the team to move chooses the best of a few `STRATEGIES`: going
+for one word, which almost always works, or for more words with less
+certainty. A table only depends on its size, and a smaller table is the
+corner of a larger one, so boards with any number of words per team can
+share the same table.
+
+Tables are solved with NumPy, one diagonal of positions at a time, and
+saved in the package's data directory, or in `CACHE_DIR` if that isn't
+writable, so each size is only solved once.
+"""
+import hashlib
+import os
+import threading
+from typing import Dict, List
+
+import numpy as np
+from pkg_resources import resource_filename
+
+from codenames.storage import atomic_write
+
+# Big enough for the standard game, where a team has at most 9 words
+DEFAULT_SIZE = 10
+
+# Each strategy is a list of `(words, probability)` pairs: the chance of
+# the team to move getting that many of its words before the turn ends.
+STRATEGIES = [
+    [(1, .99), (0, .01)],
+    [(2, .5), (1, .3), (0, .2)],
+    [(3, .1), (2, .4), (1, .4), (0, .1)],
+]
+
+# Where tables are saved, and where else to save them if that's read-only
+DATA_DIR = resource_filename('codenames', 'data')
+CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'codenames'
+)
+
+_tables: Dict[int, np.ndarray] = {}
+_tables_lock = threading.Lock()
+
+
+def solve(size: int = DEFAULT_SIZE) -> np.ndarray:
+    """
+    Solve for the `size` x `size` table of position values.
+
+    A position's value depends on positions with fewer words left in total,
+    and on the position with the same counts the other way around. So the
+    table is filled in one diagonal `ours + theirs` at a time. On each
+    diagonal, the positions where `ours <= theirs` are computed first, from
+    the values their mirror images had before this diagonal was started,
+    and then the rest are computed from those.
+    """
+    table = np.ones((size, size), dtype='f')
+    table[0, :] = 1.
+    table[1, :] = .99
+    table[:, 0] = 0.
+    for total in range(3, 2 * size - 1):
+        ours = np.arange(max(1, total - size + 1), min(size, total))
+        theirs = total - ours
+        for half in (ours <= theirs, ours > theirs):
+            table[ours[half], theirs[half]] = _values(table, ours[half], theirs[half])
+    return table
+
+
+def _values(table: np.ndarray, ours: np.ndarray, theirs: np.ndarray) -> np.ndarray:
+    """
+    The value of moving in each of the positions `(ours, theirs)`, given the
+    values in `table` of the positions that each turn could lead to.
+    """
+    best = None
+    for strategy in STRATEGIES:
+        # The other team moves next, from the position where we've got
+        # `words` of ours
+        opponent_wins = sum(
+            table[theirs, np.maximum(ours - words, 0)] * prob
+            for (words, prob) in strategy
+        )
+        best = opponent_wins if best is None else np.minimum(best, opponent_wins)
+    return 1 - best
+
+
+def table_filenames(size: int) -> List[str]:
+    """
+    Where the table of `size` may be saved: in the package's data directory,
+    or else in `CACHE_DIR`. The name includes a hash of `STRATEGIES`, so
+    changing the model never loads a stale table.
+    """
+    model = hashlib.sha1(repr(STRATEGIES).encode('utf-8')).hexdigest()[:12]
+    basename = 'position-values-%d-%s.npy' % (size, model)
+    return [os.path.join(DATA_DIR, basename), os.path.join(CACHE_DIR, basename)]
+
+
+def _save(table: np.ndarray, filename: str):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with atomic_write(filename, suffix='.tmp.npy') as out:
+        np.save(out, table)
+
+
+def _load_or_solve(size: int) -> np.ndarray:
+    filenames = table_filenames(size)
+    for filename in filenames:
+        try:
+            table = np.load(filename)
+            if table.shape == (size, size):
+                return table
+        except (OSError, ValueError):
+            pass
+    table = solve(size)
+    for filename in filenames:
+        try:
+            _save(table, filename)
+            break
+        except OSError:
+            # Try the next directory; if none is writable, solve it again
+            # next time
+            pass
+    return table
+
+
+def position_values(size: int = DEFAULT_SIZE) -> np.ndarray:
+    """
+    Get a table of position values of at least `size` x `size`, loading or
+    solving it the first time it's needed. Tables smaller than the default
+    size are never made, and any table that's big enough is used, so normal
+    games all share one table.
+
+    The result is shared, and mustn't be modified.
+    """
+    size = max(size, DEFAULT_SIZE)
+    for existing_size, table in list(_tables.items()):
+        if existing_size >= size:
+            return table
+    with _tables_lock:
+        if size not in _tables:
+            table = _load_or_solve(size)
+            table.flags.writeable = False
+            _tables[size] = table
+    return _tables[size]
@@ -0,0 +1,173 @@
+"""
+Log the events of many games compactly, for analysis, and read them back.
+
+`EventLogChannel` is a channel that writes one record per event it's
+notified of, as `[tag, speaker, payload]`. Teams in the payload are
+written as their numeric values. Records are buffered and written in large
+batches, instead of being formatted for a terminal and flushed one line
+at a time like `FileStreamChannel`.
+
+There are two formats, both written to a binary stream:
+
+- 'jsonl': each record is a line of JSON, easy to read with other tools
+- 'binary': each record is the same JSON, in UTF-8, prefixed with its
+  32-bit little-endian length, so a reader can skip records without
+  parsing them
+
+`read_events` reads either one back as `(tag, speaker, value)` tuples,
+with the same values that were passed to `notify`, and `replay` sends
+them to another channel, such as a `FileStreamChannel` to watch a game
+again.
+"""
+import json
+import struct
+from typing import IO, Iterable, Iterator, List, Tuple
+
+from codenames import Channel, Team
+
+FORMATS = ('jsonl', 'binary')
+
+# How many bytes of records to collect before writing them
+BUFFER_SIZE = 1 << 20
+
+_LENGTH = struct.Struct('<I')
+
+
+def encode_value(tag: str, value):
+    """
+    Convert the value of an event into something JSON can represent.
+    """
+    if tag == 'board':
+        return [[word, team.value] for (word, team) in value]
+    elif tag == 'reveal':
+        word, team = value
+        return [word, team.value]
+    elif tag == 'winner':
+        return value.value
+    elif tag == 'clue':
+        number, word = value
+        return [number, word]
+    return value
+
+
+def decode_value(tag: str, payload):
+    """
+    Undo `encode_value`.
+    """
+    if tag == 'board':
+        return [(word, Team(team)) for (word, team) in payload]
+    elif tag == 'reveal':
+        word, team = payload
+        return (word, Team(team))
+    elif tag == 'winner':
+        return Team(payload)
+    elif tag == 'clue':
+        number, word = payload
+        return (number, word)
+    return payload
+
+
+class EventLogChannel(Channel):
+    """
+    A channel that logs every event to `stream`, which must be opened in
+    binary mode, in one of the `FORMATS`. Nothing is written until
+    `BUFFER_SIZE` bytes of records have been collected, or the channel is
+    flushed or closed.
+    """
+    def __init__(self, stream: IO[bytes], format: str = 'jsonl'):
+        if format not in FORMATS:
+            raise ValueError("Unknown event log format: %r" % format)
+        self.stream = stream
+        self.format = format
+        self._buffer = bytearray()
+
+    @staticmethod
+    def open_filename(filename: str, format: str = 'jsonl'):
+        return EventLogChannel(open(filename, 'wb'), format)
+
+    def notify(self, tag, speaker, value):
+        record = json.dumps(
+            [tag, speaker, encode_value(tag, value)],
+            ensure_ascii=False, separators=(',', ':')
+        ).encode('utf-8')
+        if self.format == 'jsonl':
+            self._buffer += record
+            self._buffer += b'\n'
+        else:
+            self._buffer += _LENGTH.pack(len(record))
+            self._buffer += record
+        if len(self._buffer) >= BUFFER_SIZE:
+            self.flush()
+
+    def await_input(self, prompt):
+        raise RuntimeError("An event log can't answer prompts")
+
+    def flush(self):
+        if self._buffer:
+            self.stream.write(self._buffer)
+            self._buffer = bytearray()
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+        self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _records(stream: IO[bytes], format: str) -> Iterator[bytes]:
+    if format == 'jsonl':
+        for line in stream:
+            if line.strip():
+                yield line
+    elif format == 'binary':
+        while True:
+            header = stream.read(_LENGTH.size)
+            if not header:
+                return
+            if len(header) < _LENGTH.size:
+                raise ValueError("The event log ends in the middle of a record")
+            length, = _LENGTH.unpack(header)
+            record = stream.read(length)
+            if len(record) < length:
+                raise ValueError("The event log ends in the middle of a record")
+            yield record
+    else:
+        raise ValueError("Unknown event log format: %r" % format)
+
+
+def read_events(stream: IO[bytes], format: str = 'jsonl') -> Iterator[Tuple[str, str, object]]:
+    """
+    Read the events written by an `EventLogChannel` as `(tag, speaker,
+    value)` tuples.
+    """
+    for record in _records(stream, format):
+        tag, speaker, payload = json.loads(record)
+        yield tag, speaker, decode_value(tag, payload)
+
+
+def split_games(events: Iterable[Tuple[str, str, object]]) -> Iterator[List[Tuple[str, str, object]]]:
+    """
+    Split the events of a log of many games into one list per game. Each
+    game ends with its 'winner' event.
+    """
+    game = []
+    for event in events:
+        game.append(event)
+        if event[0] == 'winner':
+            yield game
+            game = []
+    if game:
+        yield game
+
+
+def replay(events: Iterable[Tuple[str, str, object]], channel: Channel):
+    """
+    Notify `channel` of each of `events`, in order.
+    """
+    for tag, speaker, value in events:
+        channel.notify(tag, speaker, value)
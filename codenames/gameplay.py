@@ -1,5 +1,5 @@
 from codenames import (CodenamesBoard, Team, Spymaster, Guesser)
-from typing import Dict
+from typing import Dict, Generator, List, Tuple
 
 
 def notify_all(channels, tag, speaker, value):
@@ -7,50 +7,93 @@ def notify_all(channels, tag, speaker, value):
         channel.notify(tag, speaker, value)
 
 
-def run_game(spymasters: Dict[Team, Spymaster], guessers: Dict[Team, Guesser], board=None):
+# A call that the game needs made: a method name and its arguments, to call
+# on each of a list of players or channels
+Call = Tuple[list, str, tuple]
+
+
+def game_steps(spymasters: Dict[Team, Spymaster], guessers: Dict[Team, Guesser], board=None,
+               max_turns: int = None) -> Generator[Call, List, Team]:
+    """
+    The rules of a game, without the calls to the players. This is a
+    generator that yields each call the game needs, as `(receivers, method,
+    args)`, and must be sent back the list of what each receiver returned.
+    It returns the winning team.
+
+    `run_game` makes the calls directly, and `codenames.server.run_game`
+    awaits them, so the two play by the same rules.
+    """
     if board is None:
         board = CodenamesBoard.generate()
-    spymaster_channels = set(spymaster.channel for spymaster in spymasters.values())
+    spymaster_channels = list(set(spymaster.channel for spymaster in spymasters.values()))
     guesser_channels = set(guesser.channel for guesser in guessers.values())
-    all_channels = spymaster_channels | guesser_channels
+    all_channels = list(guesser_channels.union(spymaster_channels))
+
+    def notify(channels, tag, speaker, value):
+        return (channels, 'notify', (tag, speaker, value))
+
     current_team = Team.red
+    turns = 0
     while True:
-        # If there's a winner, notify players and end the game
+        # If there's a winner, or no turns are left, notify players and end
+        # the game
         winner = board.winner()
-        if winner in (Team.red, Team.blue):
-            notify_all(all_channels, 'board', 'Host', board.spy_items())
-            notify_all(all_channels, 'winner', 'Host', winner)
+        out_of_turns = max_turns is not None and turns >= max_turns
+        if winner in (Team.red, Team.blue) or out_of_turns:
+            yield notify(all_channels, 'board', 'Host', board.spy_items())
+            yield notify(all_channels, 'winner', 'Host', winner)
+            yield (list(spymasters.values()), 'end_game', (board,))
             return winner
 
         # Update the board and get a clue from the spymaster
         spymaster = spymasters[current_team]
-        notify_all(all_channels, 'board', 'Host', board.known_items())
-        notify_all(all_channels, 'status', 'Host',
-                   "%s's turn to give a clue." % spymaster.name())
-        clue_number, clue_word = spymaster.get_clue(board)
-        notify_all(all_channels, 'clue', spymaster.name(), (clue_number, clue_word))
+        yield notify(all_channels, 'board', 'Host', board.known_items())
+        yield notify(all_channels, 'status', 'Host',
+                     "%s's turn to give a clue." % spymaster.name())
+        [(clue_number, clue_word)] = yield ([spymaster], 'get_clue', (board,))
+        yield notify(all_channels, 'clue', spymaster.name(), (clue_number, clue_word))
 
         # Now it's the guesser's turn.
         guesser = guessers[current_team]
+        yield ([guesser], 'receive_clue', (clue_number, clue_word))
         for guess_number in range(clue_number + 1):
-            guess_word = guesser.get_guess(board)
+            [guess_word] = yield ([guesser], 'get_guess', (board,))
             if guess_word is None:
-                notify_all(all_channels, 'status', 'Host',
-                           '%s passes.' % guesser.name())
+                yield notify(all_channels, 'status', 'Host',
+                             '%s passes.' % guesser.name())
                 break
             else:
-                notify_all(spymaster_channels, 'status', 'Host',
-                           '%s guesses %s.' % (guesser.name(), guess_word))
+                yield notify(spymaster_channels, 'status', 'Host',
+                             '%s guesses %s.' % (guesser.name(), guess_word))
                 picked_color = board.get_word_team(guess_word)
                 board.reveal_word(guess_word)
-                notify_all(all_channels, 'reveal', 'Host', (guess_word, picked_color))
+                yield notify(all_channels, 'reveal', 'Host', (guess_word, picked_color))
 
                 if picked_color is Team.assassin:
                     winner = current_team.opponent()
-                    notify_all(all_channels, 'board', 'Host', board.spy_items())
-                    notify_all(all_channels, 'winner', 'Host', winner)
+                    yield notify(all_channels, 'board', 'Host', board.spy_items())
+                    yield notify(all_channels, 'winner', 'Host', winner)
+                    yield (list(spymasters.values()), 'end_game', (board,))
                     return winner
                 elif picked_color != current_team:
                     break
 
         current_team = current_team.opponent()
+        turns += 1
+
+
+def run_game(spymasters: Dict[Team, Spymaster], guessers: Dict[Team, Guesser], board=None,
+             max_turns: int = None):
+    """
+    Play a game to the end, and return the winning team. If `max_turns` is
+    given and that many clues are given without a winner, the game ends in
+    a draw, and the winner is `Team.unknown`.
+    """
+    steps = game_steps(spymasters, guessers, board, max_turns)
+    results = None
+    while True:
+        try:
+            receivers, method, args = steps.send(results)
+        except StopIteration as stop:
+            return stop.value
+        results = [getattr(receiver, method)(*args) for receiver in receivers]
@@ -0,0 +1,135 @@
+"""
+Optional measurements of where the time goes while an AI gives a clue.
+
+Give an `AISpymaster` a `stats_hook`, and after each clue it calls the hook
+with a `ClueStats` for that clue. Without a hook, the spymaster records
+into `NO_STATS`, which ignores everything, so instrumentation costs a few
+no-op method calls per clue.
+
+    recorder = StatsRecorder()
+    spymaster = AISpymaster(Team.red, channel, stats_hook=recorder)
+    ...
+    print(recorder)
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class _Timer:
+    """
+    Adds the time spent in a `with` block to a stage of a `ClueStats`.
+    """
+    __slots__ = ('stats', 'name', 'start')
+
+    def __init__(self, stats: 'ClueStats', name: str):
+        self.stats = stats
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        self.stats.timings[self.name] = self.stats.timings.get(self.name, 0.) + elapsed
+
+
+class ClueStats:
+    """
+    What happened while giving one clue.
+
+    `timings` maps each stage to the seconds spent in it, in the order the
+    stages ran. `counters` counts things such as the clues in the vocabulary,
+    the ones that were legal, and the questions asked of ConceptNet.
+    `rejections[n - 1]` is how many illegal clues would have been among the
+    candidates for a clue for n words if they'd been allowed.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.rejections: List[int] = []
+        self.clue: Optional[Tuple[int, str]] = None
+
+    def stage(self, name: str) -> _Timer:
+        return _Timer(self, name)
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    @property
+    def total_time(self) -> float:
+        return sum(self.timings.values())
+
+    def as_dict(self) -> dict:
+        return {
+            'clue': self.clue,
+            'timings': dict(self.timings),
+            'counters': dict(self.counters),
+            'rejections': list(self.rejections),
+        }
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class NullStats:
+    """
+    Stands in for a `ClueStats` when nothing is listening.
+    """
+    enabled = False
+    _timer = _NullTimer()
+
+    def stage(self, name: str) -> _NullTimer:
+        return self._timer
+
+    def count(self, name: str, n: int = 1):
+        pass
+
+
+NO_STATS = NullStats()
+
+
+class StatsRecorder:
+    """
+    A stats hook that adds up the `ClueStats` of many clues.
+    """
+    def __init__(self):
+        self.clues = 0
+        self.timings: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.rejections: List[int] = []
+
+    def __call__(self, stats: ClueStats):
+        self.clues += 1
+        for name, elapsed in stats.timings.items():
+            self.timings[name] = self.timings.get(name, 0.) + elapsed
+        for name, n in stats.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + n
+        for i, n in enumerate(stats.rejections):
+            if i < len(self.rejections):
+                self.rejections[i] += n
+            else:
+                self.rejections.append(n)
+
+    def __str__(self):
+        lines = ['clues: %d' % self.clues]
+        if self.clues:
+            lines += [
+                'stage %-14s %8.2f ms per clue' % (name, elapsed / self.clues * 1000)
+                for (name, elapsed) in self.timings.items()
+            ]
+            lines += [
+                'count %-14s %8.1f per clue' % (name, n / self.clues)
+                for (name, n) in self.counters.items()
+            ]
+            lines.append('rejections by number clued: %s' % self.rejections)
+        return '\n'.join(lines)
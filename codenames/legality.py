@@ -0,0 +1,179 @@
+"""
+An offline index of the clues that each Codenames word rules out.
+
+A clue is illegal if it contains a word on the board, or if ConceptNet says
+one is a form of the other (such as "STATES" for "STATE"). Asking the
+ConceptNet database about every candidate clue against every word on the
+board is far too slow to do while choosing a clue, so this module asks it
+once per word in `WORDLIST`, and stores the results in
+`data/forbidden-clues.json`. Each entry maps a board word to the set of
+its forms, in upper case. Clues that contain a board word are checked
+directly, so they aren't stored.
+
+To rebuild the index, with a ConceptNet database available, run:
+
+    python -m codenames.legality
+"""
+import json
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Set
+
+from conceptnet5.db import connection as db_connection
+from conceptnet5.db.connection import get_db_connection
+from conceptnet5.db.query import AssertionFinder
+from conceptnet5.uri import uri_prefix
+from conceptnet5.vectors import standardized_uri
+from pkg_resources import resource_filename
+
+INDEX_FILENAME = resource_filename('codenames', 'data/forbidden-clues.json')
+
+# How many answers from ConceptNet to remember
+CACHE_SIZE = 65536
+
+_index = None
+_index_lock = threading.Lock()
+_finder = None
+_finder_pid = None
+_finder_lock = threading.Lock()
+# The process that conceptnet5's cache of connections belongs to, and the
+# connections a forked child inherited from it
+_connections_pid = os.getpid()
+_inherited_connections = []
+
+
+def _forget_inherited_connections():
+    """
+    In a forked child, move the connections it inherited out of conceptnet5's
+    cache, so that it opens its own instead of sharing its parent's socket.
+    They're kept referenced, never closed: closing one, even by garbage
+    collection, would end the parent's session. Call with `_finder_lock`
+    held.
+    """
+    global _connections_pid
+    if _connections_pid != os.getpid():
+        _inherited_connections.extend(db_connection._CONNECTIONS.values())
+        db_connection._CONNECTIONS.clear()
+        _connections_pid = os.getpid()
+
+
+def get_finder() -> AssertionFinder:
+    """
+    Get the `AssertionFinder` shared by this process. It connects to the
+    database the first time it's queried, so getting it is free. A forked
+    child process gets its own, with its own connection, instead of sharing
+    its parent's.
+    """
+    global _finder, _finder_pid
+    if _finder is None or _finder_pid != os.getpid():
+        with _finder_lock:
+            _forget_inherited_connections()
+            if _finder is None or _finder_pid != os.getpid():
+                _finder = AssertionFinder()
+                _finder_pid = os.getpid()
+    return _finder
+
+
+def _connect(finder: AssertionFinder):
+    """
+    Connect `finder` to the database if it isn't yet. It would connect on
+    its first query by itself, but without a lock, so threads sharing it
+    could each open a connection.
+    """
+    if finder.connection is None:
+        with _finder_lock:
+            _forget_inherited_connections()
+            if finder.connection is None:
+                finder.connection = get_db_connection(finder.dbname)
+
+
+def forms_of(finder, word: str) -> Set[str]:
+    """
+    Ask ConceptNet for the words that are forms of `word`, or that `word` is
+    a form of, in upper case.
+    """
+    if isinstance(finder, AssertionFinder):
+        _connect(finder)
+    uri = standardized_uri('en', word)
+    edges = finder.query(
+        {'node': uri, 'rel': '/r/FormOf', 'sources': '/s/resource/wiktionary/en/'},
+        limit=1000
+    )
+    forms = set()
+    for edge in edges:
+        for node in (edge['start'], edge['end']):
+            other = uri_prefix(node['@id'])
+            if other != uri and other.startswith('/c/en/'):
+                forms.add(other[6:].replace('_', ' ').upper())
+    return forms
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def cached_forms_of(finder, word: str) -> FrozenSet[str]:
+    """
+    `forms_of`, remembering the answers for the most recently asked words.
+    """
+    return frozenset(forms_of(finder, word))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def is_form_of(finder, word: str, clue: str) -> bool:
+    """
+    Ask ConceptNet whether `clue` is a form of `word` or vice versa,
+    remembering the answers for the most recently asked pairs.
+    """
+    edges = finder.query({
+        'node': standardized_uri('en', word), 'other': standardized_uri('en', clue),
+        'rel': '/r/FormOf', 'sources': '/s/resource/wiktionary/en/'
+    })
+    return bool(edges)
+
+
+def build_index(finder, words: Iterable[str]) -> Dict[str, Set[str]]:
+    """
+    Build the index of forbidden clues for each of `words`: the forms of
+    each word, according to ConceptNet.
+    """
+    return {word: forms_of(finder, word) for word in words}
+
+
+def save_index(index: Dict[str, Set[str]], filename=INDEX_FILENAME):
+    data = {word: sorted(forbidden) for (word, forbidden) in index.items()}
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w', encoding='utf-8') as out:
+        json.dump(data, out, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_filename, filename)
+
+
+def load_index(filename=INDEX_FILENAME) -> Dict[str, FrozenSet[str]]:
+    with open(filename, encoding='utf-8') as infile:
+        data = json.load(infile)
+    return {word: frozenset(forbidden) for (word, forbidden) in data.items()}
+
+
+def get_forbidden_index() -> Dict[str, FrozenSet[str]]:
+    """
+    Get the index of forbidden clues, loading it the first time it's needed.
+    If it hasn't been built, it's empty, and every word has to be checked
+    against the database.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if os.path.exists(INDEX_FILENAME):
+                    _index = load_index()
+                else:
+                    _index = {}
+    return _index
+
+
+def main():
+    from codenames import WORDLIST
+
+    save_index(build_index(get_finder(), WORDLIST))
+
+
+if __name__ == '__main__':
+    main()
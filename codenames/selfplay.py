@@ -0,0 +1,189 @@
+"""
+Play AI-vs-AI games with no one watching, to evaluate changes to the
+spymaster by how often it wins.
+
+    python -m codenames.selfplay -n 200 --seed 0
+
+Game `i` of a run with seed `s` is played on the board generated from
+`random.Random(s + i)`, so runs are reproducible, and give the same results
+when they're spread across several worker processes with `--workers`.
+"""
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, List, NamedTuple
+
+from codenames import CodenamesBoard, NullChannel, Team, ai
+from codenames.ai import AIGuesser, AISpymaster, DummySpymaster, ShortlistSpymaster
+from codenames.gameplay import run_game
+from codenames.vectors import SharedVectors
+
+# Games that go this many turns without a winner are drawn, so a spymaster
+# that never gets anywhere can't hang a run
+MAX_TURNS = 50
+
+
+class RecordingChannel(NullChannel):
+    """
+    A channel that keeps every event it's notified of, as a list of
+    `(tag, speaker, value)` tuples.
+    """
+    def __init__(self):
+        self.events = []
+
+    def notify(self, tag, speaker, value):
+        self.events.append((tag, speaker, value))
+
+
+class GameResult(NamedTuple):
+    """
+    The outcome of one game. `winner` is `Team.unknown` if the game ran out
+    of turns.
+    """
+    seed: int
+    winner: Team
+    turns: int
+    assassin: bool
+
+
+class SelfPlayReport:
+    """
+    Summarizes the results of a run of self-play games.
+    """
+    def __init__(self, results: List[GameResult], elapsed: float):
+        self.results = results
+        self.elapsed = elapsed
+
+    @property
+    def games(self) -> int:
+        return len(self.results)
+
+    def wins(self) -> Dict[Team, int]:
+        counts = {Team.red: 0, Team.blue: 0}
+        for result in self.results:
+            if result.winner in counts:
+                counts[result.winner] += 1
+        return counts
+
+    def win_rate(self, team: Team) -> float:
+        return self.wins()[team] / self.games
+
+    @property
+    def draws(self) -> int:
+        return sum(result.winner is Team.unknown for result in self.results)
+
+    @property
+    def assassin_hits(self) -> int:
+        return sum(result.assassin for result in self.results)
+
+    @property
+    def mean_turns(self) -> float:
+        return sum(result.turns for result in self.results) / self.games
+
+    @property
+    def games_per_second(self) -> float:
+        return self.games / self.elapsed
+
+    def __str__(self):
+        return '\n'.join([
+            'games:            %d' % self.games,
+            'red win rate:     %.3f' % self.win_rate(Team.red),
+            'blue win rate:    %.3f' % self.win_rate(Team.blue),
+            'draws:            %d' % self.draws,
+            'assassin hits:    %d' % self.assassin_hits,
+            'turns per game:   %.2f' % self.mean_turns,
+            'games per second: %.2f' % self.games_per_second,
+        ])
+
+
+def play_game(seed: int, spymaster_class=AISpymaster, guesser_class=AIGuesser,
+              max_turns: int = MAX_TURNS) -> GameResult:
+    """
+    Play one game on the board generated from `seed`, with a new spymaster
+    and guesser of the given classes for each team. After `max_turns` clues
+    with no winner, the game is a draw.
+    """
+    board = CodenamesBoard.generate(random.Random(seed))
+    channel = RecordingChannel()
+    spymasters = {team: spymaster_class(team, channel) for team in (Team.red, Team.blue)}
+    guessers = {team: guesser_class(team, channel) for team in (Team.red, Team.blue)}
+    winner = run_game(spymasters, guessers, board, max_turns)
+
+    turns = sum(tag == 'clue' for (tag, _, _) in channel.events)
+    assassin = any(
+        tag == 'reveal' and value[1] is Team.assassin
+        for (tag, _, value) in channel.events
+    )
+    return GameResult(seed, winner, turns, assassin)
+
+
+def play_games(ngames: int, seed: int = 0, spymaster_class=AISpymaster,
+               guesser_class=AIGuesser) -> SelfPlayReport:
+    """
+    Play `ngames` games in this process, with the seeds `seed` through
+    `seed + ngames - 1`.
+    """
+    start = time.perf_counter()
+    results = [
+        play_game(seed + i, spymaster_class, guesser_class)
+        for i in range(ngames)
+    ]
+    return SelfPlayReport(results, time.perf_counter() - start)
+
+
+def _attach_vectors(shared: SharedVectors):
+    ai.set_vectors(shared.attach())
+
+
+def play_games_parallel(ngames: int, seed: int = 0, spymaster_class=AISpymaster,
+                        guesser_class=AIGuesser, workers: int = None) -> SelfPlayReport:
+    """
+    Play `ngames` games like `play_games`, spread across a pool of `workers`
+    processes (by default, one per CPU).
+
+    The clue vectors are loaded once, in this process, and shared with the
+    workers without copying them; see `SharedVectors`.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    start = time.perf_counter()
+    with SharedVectors(ai.get_vectors()) as shared:
+        with ProcessPoolExecutor(workers, initializer=_attach_vectors,
+                                 initargs=(shared,)) as pool:
+            results = list(pool.map(
+                play_game, range(seed, seed + ngames),
+                repeat(spymaster_class), repeat(guesser_class),
+                chunksize=max(1, ngames // (8 * workers))
+            ))
+    return SelfPlayReport(results, time.perf_counter() - start)
+
+
+SPYMASTERS = {
+    'ai': AISpymaster,
+    'dummy': DummySpymaster,
+    'shortlist': ShortlistSpymaster,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play AI-vs-AI games of Codenames.")
+    parser.add_argument('-n', '--games', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--spymaster', choices=sorted(SPYMASTERS), default='ai')
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of worker processes, or 0 for one per CPU")
+    args = parser.parse_args()
+    spymaster_class = SPYMASTERS[args.spymaster]
+    if args.workers == 1:
+        report = play_games(args.games, args.seed, spymaster_class)
+    else:
+        report = play_games_parallel(args.games, args.seed, spymaster_class,
+                                     workers=args.workers or None)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
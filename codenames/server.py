@@ -0,0 +1,224 @@
+"""
+Host many games of Codenames in one process, over plain TCP streams.
+
+Each connection to the server is a game: the person connected guesses for
+both teams, as in `codenames.console`, and AI spymasters give the clues.
+Games are coroutines, and the spymasters' clue computations run in an
+executor, so a slow clue never stalls the other games.
+
+The default executor is a thread pool. NumPy releases the GIL during the
+big matrix products, so those run in parallel, but the rest of choosing a
+clue holds it, so one process only goes so far under load; run several
+servers to use more cores. A process pool would need the spymasters to
+live in the worker processes, since they remember the clues they've given.
+
+    python -m codenames.server --port 8765
+
+and then connect with `nc localhost 8765` or `telnet localhost 8765`.
+"""
+import argparse
+import asyncio
+import io
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from codenames import CodenamesBoard, Guesser, NullChannel, Spymaster, Team
+from codenames.ai import AISpymaster, warm_up
+from codenames.console import FileStreamChannel
+from codenames.gameplay import game_steps
+
+
+class AsyncChannel:
+    """
+    The non-blocking counterpart of `Channel`.
+    """
+    async def notify(self, tag, speaker, value):
+        raise NotImplementedError
+
+    async def await_input(self, prompt):
+        raise NotImplementedError
+
+
+class StreamChannel(AsyncChannel):
+    """
+    Talks to a player over an asyncio stream, formatting events the same
+    way as `FileStreamChannel`.
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self._text = io.StringIO()
+        self._formatter = FileStreamChannel(self._text)
+
+    async def _send(self):
+        self.writer.write(self._text.getvalue().encode('utf-8'))
+        self._text.seek(0)
+        self._text.truncate()
+        await self.writer.drain()
+
+    async def notify(self, tag, speaker, value):
+        self._formatter.notify(tag, speaker, value)
+        await self._send()
+
+    async def await_input(self, prompt):
+        print(prompt, file=self._text)
+        print('> ', end='', file=self._text)
+        await self._send()
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("The player disconnected")
+        return line.decode('utf-8', errors='replace').strip()
+
+
+class AsyncPlayer:
+    def __init__(self, team: Team, channel: AsyncChannel):
+        self.team = team
+        self.channel = channel
+
+
+class AsyncSpymaster(AsyncPlayer):
+    async def get_clue(self, board: CodenamesBoard) -> (int, str):
+        raise NotImplementedError
+
+    async def end_game(self, board: CodenamesBoard) -> None:
+        pass
+
+
+class AsyncGuesser(AsyncPlayer):
+    async def receive_clue(self, clue_number: int, clue_word: str) -> None:
+        pass
+
+    async def get_guess(self, board: CodenamesBoard) -> Optional[str]:
+        raise NotImplementedError
+
+
+class ExecutorSpymaster(AsyncSpymaster):
+    """
+    Runs a blocking `Spymaster`, such as an `AISpymaster`, in an executor.
+    """
+    def __init__(self, spymaster: Spymaster, channel: AsyncChannel, executor: Executor = None):
+        self.spymaster = spymaster
+        self.executor = executor
+        super().__init__(spymaster.team, channel)
+
+    def name(self):
+        return self.spymaster.name()
+
+    async def get_clue(self, board: CodenamesBoard) -> (int, str):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.spymaster.get_clue, board)
+
+    async def end_game(self, board: CodenamesBoard) -> None:
+        self.spymaster.end_game(board)
+
+
+class InlineGuesser(AsyncGuesser):
+    """
+    Runs a `Guesser` that never blocks for long, such as an `AIGuesser`,
+    directly on the event loop.
+    """
+    def __init__(self, guesser: Guesser, channel: AsyncChannel):
+        self.guesser = guesser
+        super().__init__(guesser.team, channel)
+
+    def name(self):
+        return self.guesser.name()
+
+    async def receive_clue(self, clue_number: int, clue_word: str) -> None:
+        self.guesser.receive_clue(clue_number, clue_word)
+
+    async def get_guess(self, board: CodenamesBoard) -> Optional[str]:
+        return self.guesser.get_guess(board)
+
+
+class RemoteGuesser(AsyncGuesser):
+    """
+    The non-blocking counterpart of `HumanConsoleGuesser`.
+    """
+    def name(self):
+        return "%s guesser" % self.team.name.title()
+
+    async def get_guess(self, board: CodenamesBoard) -> Optional[str]:
+        valid = board.valid_guesses()
+        prompt = "%s, type a word or 'pass':" % self.name()
+        while True:
+            reply = (await self.channel.await_input(prompt)).upper()
+            if reply == 'PASS':
+                return None
+            elif reply in valid:
+                return reply
+            else:
+                prompt = '%r is not an available word.' % reply
+
+
+async def run_game(spymasters: Dict[Team, AsyncSpymaster], guessers: Dict[Team, AsyncGuesser],
+                   board=None, max_turns: int = None):
+    """
+    The coroutine version of `codenames.gameplay.run_game`, playing by the
+    same `game_steps`. Calls to several channels at once are made
+    concurrently.
+    """
+    steps = game_steps(spymasters, guessers, board, max_turns)
+    results = None
+    while True:
+        try:
+            receivers, method, args = steps.send(results)
+        except StopIteration as stop:
+            return stop.value
+        results = await asyncio.gather(*[getattr(receiver, method)(*args) for receiver in receivers])
+
+
+class GameServer:
+    """
+    Starts a game for each connection, with spymasters of `spymaster_class`
+    and the connected player guessing for both teams. Clues are computed in
+    `executor`, which is shared by every game, and a thread pool by default.
+    """
+    def __init__(self, executor: Executor = None, spymaster_class=AISpymaster,
+                 max_turns: int = None):
+        if executor is None:
+            executor = ThreadPoolExecutor(os.cpu_count())
+        self.executor = executor
+        self.spymaster_class = spymaster_class
+        self.max_turns = max_turns
+        self.games = 0
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        channel = StreamChannel(reader, writer)
+        spymasters = {
+            team: ExecutorSpymaster(self.spymaster_class(team, NullChannel()), channel,
+                                    self.executor)
+            for team in (Team.red, Team.blue)
+        }
+        guessers = {team: RemoteGuesser(team, channel) for team in (Team.red, Team.blue)}
+        self.games += 1
+        try:
+            await run_game(spymasters, guessers, max_turns=self.max_turns)
+        except ConnectionError:
+            pass
+        finally:
+            self.games -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host games of Codenames over TCP.")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    warm_up()
+    asyncio.run(GameServer().serve(args.host, args.port))
+
+
+if __name__ == '__main__':
+    main()
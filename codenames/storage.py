@@ -0,0 +1,36 @@
+"""
+Saving data files so that no reader ever sees one half-written.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+def _umask() -> int:
+    # The only way to read the umask is to set it, so set it back right away
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+@contextmanager
+def atomic_write(filename: str, suffix: str = '.tmp'):
+    """
+    Open a uniquely named temporary file next to `filename`, for writing in
+    binary mode, and when the `with` block finishes, rename it to
+    `filename`. Processes saving the same file at once never collide, and
+    if the block raises, the temporary file is removed.
+
+    The file gets the permissions that a file created with `open` would
+    have, rather than the owner-only permissions of a temporary file, so
+    other users can read it from a shared install.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=suffix, delete=False) as out:
+        try:
+            yield out
+        except BaseException:
+            os.unlink(out.name)
+            raise
+    os.chmod(out.name, 0o666 & ~_umask())
+    os.replace(out.name, filename)
@@ -0,0 +1,581 @@
+"""
+The clue vocabulary: L2-normalized term vectors for every English word that
+the AI is allowed to use as a clue.
+
+Building this vocabulary from `data/mini.h5` means loading the whole HDF5
+file, checking the word frequency of every label, and normalizing what's
+left, which is too slow to do every time a process starts. `build_store`
+does it once and writes the result as a raw float32 matrix plus a file of
+labels, one per line. `open_store` maps that matrix into memory with
+`np.memmap`, so processes that open the same store start quickly and share
+its pages through the OS page cache.
+
+To rebuild the store after changing `mini.h5`, run:
+
+    python -m codenames.vectors
+
+The vectors can also be stored in half or a quarter of the memory, as
+float16 or as int8 with a scale for each row; build those stores with
+`--dtype float16` or `--dtype int8`, and choose one at runtime with the
+`CODENAMES_VECTOR_DTYPE` environment variable.
+
+The store also has a table of what's known about each word (see
+`Vocabulary`), so none of it has to be worked out again when the store is
+opened. Its rows are sorted by word frequency, so a stricter frequency
+threshold, set with the `CODENAMES_MIN_ZIPF` environment variable, just
+uses fewer of them. Because the AI breaks ties between equally good clues
+in favor of the earlier row, the more frequent word wins a tie.
+"""
+import argparse
+import os
+import sys
+import threading
+from collections import OrderedDict
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+import wordfreq
+from conceptnet5.vectors import standardized_uri
+from conceptnet5.vectors.formats import load_hdf
+from conceptnet5.vectors.transforms import l2_normalize_rows
+from pkg_resources import resource_filename
+
+from codenames import untag_en
+
+HDF_FILENAME = resource_filename('codenames', 'data/mini.h5')
+MATRIX_FILENAME = resource_filename('codenames', 'data/clue-vectors.f32')
+LABELS_FILENAME = resource_filename('codenames', 'data/clue-labels.txt')
+VOCAB_FILENAME = resource_filename('codenames', 'data/clue-vocab.npz')
+
+# The least frequent a word can be, on the zipf scale, to be in the
+# vocabulary at all. A higher threshold can be chosen when loading it.
+MIN_ZIPF = 3.0
+
+# The types the vectors can be stored in, and the extension of the matrix
+# file for each. An int8 store also has a file of row scales.
+DTYPES = {'float32': '.f32', 'float16': '.f16', 'int8': '.i8'}
+SCALES_SUFFIX = '.scales.f32'
+
+# How many rows of a quantized matrix to convert to float32 at a time
+BLOCK_ROWS = 8192
+
+
+class Vocabulary:
+    """
+    What's known about each row of the clue vectors, as arrays: its URI
+    (`labels`), the word it would be given as a clue (`words`), that word in
+    upper case (`clue_words`, as checked by `CodenamesBoard.clue_mask`), and
+    its word frequency on the zipf scale (`zipf`).
+
+    The first `nfixed` rows are the words in `WORDLIST`, which are always
+    included. The rest are sorted from most to least frequent, so the
+    vocabulary of the words above any frequency is a prefix of the rows.
+    """
+    def __init__(self, labels: np.ndarray, words: np.ndarray, clue_words: np.ndarray,
+                 zipf: np.ndarray, nfixed: int):
+        self.labels = labels
+        self.words = words
+        self.clue_words = clue_words
+        self.zipf = zipf
+        self.nfixed = nfixed
+
+    @classmethod
+    def from_labels(cls, labels, zipf, nfixed: int) -> 'Vocabulary':
+        words = [untag_en(label) for label in labels]
+        return cls(
+            np.array(labels), np.array(words), np.array([word.upper() for word in words]),
+            np.array(zipf, dtype='f'), nfixed
+        )
+
+    def __len__(self):
+        return len(self.labels)
+
+    def size_above(self, min_zipf: float) -> int:
+        """
+        How many rows there are before the first word that isn't more
+        frequent than `min_zipf`, not counting the fixed rows.
+        """
+        # The frequencies after the fixed rows are in descending order
+        rest = -self.zipf[self.nfixed:]
+        return self.nfixed + int(np.searchsorted(rest, -min_zipf, side='left'))
+
+    def prefix(self, nrows: int) -> 'Vocabulary':
+        return Vocabulary(
+            self.labels[:nrows], self.words[:nrows], self.clue_words[:nrows],
+            self.zipf[:nrows], min(self.nfixed, nrows)
+        )
+
+    def save(self, filename=VOCAB_FILENAME):
+        tmp_filename = filename + '.tmp.npz'
+        np.savez(tmp_filename, labels=self.labels, words=self.words, clue_words=self.clue_words,
+                 zipf=self.zipf, nfixed=self.nfixed)
+        os.replace(tmp_filename, filename)
+
+    @classmethod
+    def load(cls, filename=VOCAB_FILENAME) -> 'Vocabulary':
+        with np.load(filename) as data:
+            return cls(data['labels'], data['words'], data['clue_words'], data['zipf'],
+                       int(data['nfixed']))
+
+
+class ClueVectors:
+    """
+    A matrix of normalized vectors, one row per ConceptNet URI in `labels`.
+
+    `matrix` may be an ordinary array or a read-only `np.memmap`; nothing
+    here writes to it. It may also be quantized (see `quantize`): a float16
+    matrix, or an int8 matrix whose rows are multiplied by `scales` to get
+    the vectors back. Use `rows` and `product` instead of the matrix itself
+    to get float32 results either way.
+
+    `vocab`, if it's known, is the `Vocabulary` table for the rows.
+    """
+    def __init__(self, labels, matrix, scales=None, vocab: Vocabulary = None):
+        self.labels = labels
+        self.matrix = matrix
+        self.scales = scales
+        self.vocab = vocab
+        self.index = {label: i for (i, label) in enumerate(labels)}
+        self._frame = None
+        self._words = None
+        self._clue_words = None
+
+    @property
+    def dtype(self) -> str:
+        return self.matrix.dtype.name
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """
+        The vectors as a DataFrame indexed by URI. For a float32 matrix,
+        this shares memory with `matrix`; otherwise, it's a float32 copy.
+        """
+        if self._frame is None:
+            if self.dtype == 'float32':
+                self._frame = pd.DataFrame(self.matrix, index=self.labels, copy=False)
+            else:
+                self._frame = pd.DataFrame(self.rows(slice(None)), index=self.labels)
+        return self._frame
+
+    @property
+    def words(self) -> np.ndarray:
+        """
+        The word that each row would be given as a clue.
+        """
+        if self._words is None:
+            if self.vocab is not None:
+                self._words = self.vocab.words
+            else:
+                self._words = np.array([untag_en(label) for label in self.labels])
+        return self._words
+
+    @property
+    def clue_words(self) -> np.ndarray:
+        """
+        The words that each row would be given as a clue, in upper case, for
+        checking clues against a board with `CodenamesBoard.clue_mask`.
+        """
+        if self._clue_words is None:
+            if self.vocab is not None:
+                self._clue_words = self.vocab.clue_words
+            else:
+                self._clue_words = np.char.upper(self.words)
+        return self._clue_words
+
+    def above_frequency(self, min_zipf: float) -> 'ClueVectors':
+        """
+        Get the vectors for just the words in `WORDLIST` and the words more
+        frequent than `min_zipf`. They're a prefix of these rows, so this
+        doesn't copy anything.
+        """
+        if self.vocab is None:
+            raise ValueError("These vectors have no vocabulary table to filter by frequency")
+        nrows = self.vocab.size_above(min_zipf)
+        scales = None if self.scales is None else self.scales[:nrows]
+        return ClueVectors(self.labels[:nrows], self.matrix[:nrows], scales,
+                           self.vocab.prefix(nrows))
+
+    def rows(self, indices) -> np.ndarray:
+        """
+        Get the vectors in the given rows (an index array or a slice) as
+        float32.
+        """
+        result = np.asarray(self.matrix[indices], dtype='f')
+        if self.scales is not None:
+            result = result * self.scales[indices, np.newaxis]
+        return result
+
+    def product(self, other: np.ndarray) -> np.ndarray:
+        """
+        Multiply the V x D matrix of vectors by a D x C matrix. A quantized
+        matrix is converted to float32 a block of rows at a time, so the
+        whole thing is never converted at once.
+        """
+        if self.dtype == 'float32':
+            return np.dot(self.matrix, other)
+        result = np.empty((self.matrix.shape[0], other.shape[1]), dtype='f')
+        for start in range(0, self.matrix.shape[0], BLOCK_ROWS):
+            block = self.matrix[start:start + BLOCK_ROWS].astype('f')
+            np.dot(block, other, out=result[start:start + BLOCK_ROWS])
+        if self.scales is not None:
+            result *= self.scales[:, np.newaxis]
+        return result
+
+    def vectors_for(self, labels) -> np.ndarray:
+        """
+        Get a C x D matrix of the vectors for `labels`, with zero vectors for
+        labels that aren't in the vocabulary.
+        """
+        result = np.zeros((len(labels), self.matrix.shape[1]), dtype='f')
+        found = [(i, self.index[label]) for (i, label) in enumerate(labels) if label in self.index]
+        if found:
+            positions, rows = zip(*found)
+            result[list(positions)] = self.rows(list(rows))
+        return result
+
+    def similarity(self, labels) -> np.ndarray:
+        """
+        Get a V x C matrix of the similarity of every term in the vocabulary
+        to each of the C `labels`.
+        """
+        return self.product(self.vectors_for(labels).T)
+
+
+def quantize(vectors: ClueVectors, dtype: str) -> ClueVectors:
+    """
+    Store `vectors` in a smaller type: 'float16', or 'int8' with one float32
+    scale per row, so each row's largest component is +/-127. Either halves
+    or quarters the memory of float32, at the cost of some precision in the
+    similarities.
+    """
+    if dtype not in DTYPES:
+        raise ValueError("Unknown vector type: %r" % dtype)
+    matrix = vectors.rows(slice(None))
+    if dtype == 'float32':
+        return ClueVectors(vectors.labels, matrix, vocab=vectors.vocab)
+    elif dtype == 'float16':
+        return ClueVectors(vectors.labels, matrix.astype(np.float16), vocab=vectors.vocab)
+    scales = np.max(np.abs(matrix), axis=1) / 127
+    scales[scales == 0] = 1.
+    quantized = np.rint(matrix / scales[:, np.newaxis]).astype(np.int8)
+    return ClueVectors(vectors.labels, quantized, scales.astype('f'), vectors.vocab)
+
+
+class SimilarityCache:
+    """
+    Remembers the similarity of the whole vocabulary to individual board
+    words, so that building the V x C similarity matrix for a board is a
+    gather of cached columns instead of a matrix product.
+
+    Columns live in a preallocated V x `max_columns` slab, which bounds the
+    memory used; when it's full, the least recently used columns are
+    replaced. A cache with a column for every word in `WORDLIST` never
+    needs to evict anything, and `precompute` can fill it up front.
+    """
+    def __init__(self, vectors: ClueVectors, max_columns: int = 128):
+        self.vectors = vectors
+        self.max_columns = max_columns
+        self.slab = np.empty((vectors.matrix.shape[0], max_columns), dtype='f')
+        # Maps labels to their column in the slab, least recently used first
+        self.slots = OrderedDict()
+        self._lock = threading.Lock()
+
+    def precompute(self, labels):
+        """
+        Compute columns for `labels` (at most `max_columns` of them) in a
+        single matrix product.
+        """
+        self.similarity(labels[:self.max_columns])
+
+    def similarity(self, labels) -> np.ndarray:
+        """
+        Get the same V x C matrix as `ClueVectors.similarity`.
+        """
+        with self._lock:
+            if len(set(labels)) > self.max_columns:
+                # These columns don't fit in the cache at all
+                return self.vectors.similarity(labels)
+            for label in labels:
+                if label in self.slots:
+                    self.slots.move_to_end(label)
+            missing = list(OrderedDict.fromkeys(
+                label for label in labels if label not in self.slots
+            ))
+            if missing:
+                free = self.max_columns - len(self.slots)
+                new_slots = list(range(len(self.slots), len(self.slots) + min(free, len(missing))))
+                while len(new_slots) < len(missing):
+                    _, slot = self.slots.popitem(last=False)
+                    new_slots.append(slot)
+                self.slab[:, new_slots] = self.vectors.similarity(missing)
+                self.slots.update(zip(missing, new_slots))
+            return self.slab[:, [self.slots[label] for label in labels]]
+
+
+# Shared memory blocks attached by this process, which have to stay open as
+# long as their arrays are in use
+_attached_blocks = []
+
+
+def _attach_block(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to a block of shared memory that another process owns, without
+    registering it with this process's resource tracker, which would
+    otherwise take it to be leaked and unlink it when this process exits.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Unregistering the block after attaching would be wrong when this
+    # process shares its tracker with the owner, as pool workers do, so
+    # skip registering it at all
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class SharedVectors:
+    """
+    A picklable handle for using one copy of a ClueVectors matrix from many
+    worker processes.
+
+    If the matrix was mapped from the store, workers map the same file, and
+    share its pages through the OS page cache. Otherwise, the matrix is copied
+    once into a block of shared memory, which workers attach to without
+    copying it. The process that creates the handle owns the block, and
+    should use the handle as a context manager so the block is freed when
+    the workers are done.
+
+    Only the matrix is shared. The labels, the vocabulary table and the
+    scales are pickled into each worker, so every worker still holds its
+    own copy of that O(V) metadata.
+    """
+    def __init__(self, vectors: ClueVectors):
+        self.labels = vectors.labels
+        self.shape = vectors.matrix.shape
+        self.dtype = vectors.dtype
+        # Scales and the vocabulary table are small enough to just pickle
+        self.scales = vectors.scales
+        self.vocab = vectors.vocab
+        self.filename = getattr(vectors.matrix, 'filename', None)
+        self.block_name = None
+        self._block = None
+        if self.filename is None:
+            matrix = np.asarray(vectors.matrix)
+            self._block = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+            self.block_name = self._block.name
+            shared = np.ndarray(self.shape, dtype=self.dtype, buffer=self._block.buf)
+            shared[:] = matrix
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_block'] = None
+        return state
+
+    def attach(self) -> ClueVectors:
+        """
+        Get a ClueVectors that uses the shared matrix. Call this in a worker
+        process.
+        """
+        if self.filename is not None:
+            matrix = np.memmap(self.filename, dtype=self.dtype, mode='r', shape=self.shape)
+        else:
+            block = _attach_block(self.block_name)
+            _attached_blocks.append(block)
+            matrix = np.ndarray(self.shape, dtype=self.dtype, buffer=block.buf)
+        return ClueVectors(self.labels, matrix, self.scales, self.vocab)
+
+    def close(self):
+        if self._block is not None:
+            self._block.close()
+            self._block.unlink()
+            self._block = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def build_vocabulary(labels) -> Vocabulary:
+    """
+    Choose the clue vocabulary out of the ConceptNet URIs in `labels`: all
+    the words in Codenames, followed by the single English words more
+    frequent than `MIN_ZIPF`, most frequent first.
+    """
+    # Make sure all the words in Codenames are represented
+    fixed = list(dict.fromkeys(
+        standardized_uri('en', line.strip()) for line in open(
+            resource_filename('codenames', 'data/codenames-words.txt')
+        )
+    ))
+    fixed_set = set(fixed)
+    candidates = [
+        label for label in labels
+        if label.startswith('/c/en/') and '_' not in label and '#' not in label
+        and label not in fixed_set
+    ]
+    candidate_zipf = [wordfreq.zipf_frequency(label[6:], 'en') for label in candidates]
+    selections = sorted(
+        (pair for pair in zip(candidates, candidate_zipf) if pair[1] > MIN_ZIPF),
+        key=lambda pair: -pair[1]
+    )
+    fixed_zipf = [wordfreq.zipf_frequency(label[6:], 'en') for label in fixed]
+    return Vocabulary.from_labels(
+        fixed + [label for (label, _) in selections],
+        fixed_zipf + [zipf for (_, zipf) in selections],
+        len(fixed)
+    )
+
+
+def build_vectors() -> ClueVectors:
+    """
+    Build the clue vocabulary in memory from `mini.h5`.
+    """
+    frame = load_hdf(HDF_FILENAME)
+    vocab = build_vocabulary(frame.index)
+    frame = l2_normalize_rows(frame.loc[list(vocab.labels)].astype('f'))
+    return ClueVectors(list(frame.index), frame.values, vocab=vocab)
+
+
+def store_filename(dtype: str = 'float32') -> str:
+    """
+    Get the filename of the matrix in the store for vectors of type `dtype`.
+    """
+    if dtype not in DTYPES:
+        raise ValueError("Unknown vector type: %r" % dtype)
+    return os.path.splitext(MATRIX_FILENAME)[0] + DTYPES[dtype]
+
+
+def build_store(matrix_filename=None, labels_filename=LABELS_FILENAME, dtype='float32',
+                vocab_filename=VOCAB_FILENAME):
+    """
+    Build the clue vocabulary, stored as `dtype`, and write it where
+    `open_store` can find it.
+
+    Each file is written under a temporary name and then renamed into place,
+    so a process that opens the store while it's being rebuilt sees either
+    the old version or the new one.
+    """
+    if matrix_filename is None:
+        matrix_filename = store_filename(dtype)
+    vectors = quantize(build_vectors(), dtype)
+    matrix = np.ascontiguousarray(vectors.matrix)
+
+    tmp_matrix = matrix_filename + '.tmp'
+    matrix.tofile(tmp_matrix)
+    if vectors.scales is not None:
+        vectors.scales.tofile(matrix_filename + SCALES_SUFFIX + '.tmp')
+    tmp_labels = labels_filename + '.tmp'
+    with open(tmp_labels, 'w', encoding='utf-8') as out:
+        for label in vectors.labels:
+            print(label, file=out)
+
+    os.replace(tmp_matrix, matrix_filename)
+    if vectors.scales is not None:
+        os.replace(matrix_filename + SCALES_SUFFIX + '.tmp', matrix_filename + SCALES_SUFFIX)
+    os.replace(tmp_labels, labels_filename)
+    vectors.vocab.save(vocab_filename)
+
+
+def open_store(matrix_filename=None, labels_filename=LABELS_FILENAME,
+               dtype='float32', vocab_filename=VOCAB_FILENAME) -> ClueVectors:
+    """
+    Map a store written by `build_store` into memory, without copying it.
+    Its labels come from the vocabulary table, or from the file of labels
+    if there's no table.
+    """
+    if matrix_filename is None:
+        matrix_filename = store_filename(dtype)
+    if os.path.exists(vocab_filename):
+        vocab = Vocabulary.load(vocab_filename)
+        labels = vocab.labels.tolist()
+    else:
+        vocab = None
+        with open(labels_filename, encoding='utf-8') as labelfile:
+            labels = [line.rstrip('\n') for line in labelfile]
+    itemsize = np.dtype(dtype).itemsize
+    nbytes = os.path.getsize(matrix_filename)
+    row_bytes, remainder = divmod(nbytes, len(labels))
+    if remainder or row_bytes % itemsize:
+        raise ValueError(
+            "%s doesn't contain a %s matrix with %d rows"
+            % (matrix_filename, dtype, len(labels))
+        )
+    matrix = np.memmap(
+        matrix_filename, dtype=dtype, mode='r', shape=(len(labels), row_bytes // itemsize)
+    )
+    scales = None
+    if dtype == 'int8':
+        scales = np.fromfile(matrix_filename + SCALES_SUFFIX, dtype='f')
+        if len(scales) != len(labels):
+            raise ValueError(
+                "%s has %d scales for %d rows"
+                % (matrix_filename + SCALES_SUFFIX, len(scales), len(labels))
+            )
+    return ClueVectors(labels, matrix, scales, vocab)
+
+
+def store_is_current(matrix_filename=None, labels_filename=LABELS_FILENAME,
+                     dtype='float32', vocab_filename=VOCAB_FILENAME) -> bool:
+    """
+    Check that the store exists and isn't older than `mini.h5`.
+    """
+    if matrix_filename is None:
+        matrix_filename = store_filename(dtype)
+    filenames = [matrix_filename, labels_filename, vocab_filename]
+    if dtype == 'int8':
+        filenames.append(matrix_filename + SCALES_SUFFIX)
+    try:
+        built = min(os.path.getmtime(filename) for filename in filenames)
+    except OSError:
+        return False
+    try:
+        return built >= os.path.getmtime(HDF_FILENAME)
+    except OSError:
+        # There's a store but no source to rebuild it from
+        return True
+
+
+def load_vectors(dtype: str = None, min_zipf: float = None) -> ClueVectors:
+    """
+    Open the precomputed store of vectors of type `dtype` if it's up to
+    date. If only the float32 store is, quantize that instead; otherwise,
+    fall back on building the vocabulary in memory.
+
+    If `dtype` isn't given, it's read from the `CODENAMES_VECTOR_DTYPE`
+    environment variable, and defaults to float32.
+
+    If `min_zipf` is given, or else the `CODENAMES_MIN_ZIPF` environment
+    variable is set, only the words more frequent than that (and the words
+    in Codenames) are used as clues. It can't be lower than `MIN_ZIPF`, the
+    threshold the vocabulary was built with.
+    """
+    if dtype is None:
+        dtype = os.environ.get('CODENAMES_VECTOR_DTYPE') or 'float32'
+    if min_zipf is None and os.environ.get('CODENAMES_MIN_ZIPF'):
+        min_zipf = float(os.environ['CODENAMES_MIN_ZIPF'])
+    if store_is_current(dtype=dtype):
+        vectors = open_store(dtype=dtype)
+    elif dtype != 'float32' and store_is_current(dtype='float32'):
+        vectors = quantize(open_store(dtype='float32'), dtype)
+    else:
+        vectors = quantize(build_vectors(), dtype)
+    if min_zipf is not None:
+        vectors = vectors.above_frequency(min_zipf)
+    return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the clue vector store.")
+    parser.add_argument('--dtype', choices=list(DTYPES), default='float32')
+    args = parser.parse_args()
+    build_store(dtype=args.dtype)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,13 @@
+"""
+The tables of position values that tests solve are saved in a temporary
+directory, instead of in the package.
+"""
+import atexit
+import shutil
+import tempfile
+
+from codenames import endgame
+
+_table_dir = tempfile.mkdtemp(prefix='codenames-tests-')
+atexit.register(shutil.rmtree, _table_dir, ignore_errors=True)
+endgame.DATA_DIR = endgame.CACHE_DIR = _table_dir
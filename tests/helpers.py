@@ -0,0 +1,18 @@
+"""
+Things that more than one test module needs.
+"""
+import numpy as np
+
+from codenames.vectors import ClueVectors
+
+
+def random_vectors(nrows=100, ndims=20, seed=0, labels=None):
+    """
+    Make clue vectors of random unit vectors, labeled `labels` or else
+    `/c/en/0`, `/c/en/1`, and so on.
+    """
+    if labels is None:
+        labels = ['/c/en/%d' % i for i in range(nrows)]
+    matrix = np.random.default_rng(seed).standard_normal((len(labels), ndims)).astype('f')
+    matrix /= np.linalg.norm(matrix, axis=1)[:, np.newaxis]
+    return ClueVectors(labels, matrix)
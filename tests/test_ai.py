@@ -1,10 +1,17 @@
+import random
+from contextlib import contextmanager
+
+import numpy as np
 from conceptnet5.vectors import standardized_uri
 from nose.tools import ok_, with_setup, assert_not_equal
 from pkg_resources import resource_filename
 
-from codenames import ai, CodenamesBoard, Team
-from codenames.ai import AISpymaster
+from codenames import ai, legality, CodenamesBoard, NullChannel, Team, WORDLIST
+from codenames.ai import AIGuesser, AISpymaster, ShortlistSpymaster
 from codenames.console import FileStreamChannel
+from codenames.instrument import StatsRecorder
+from codenames.vectors import SimilarityCache
+from tests.helpers import random_vectors
 
 
 def setup_board():
@@ -51,6 +58,18 @@ def test_load_vectors():
         ok_(word in vectors.frame.index)
 
 
+def test_similarity_cache():
+    vectors = ai.get_vectors()
+    cache = SimilarityCache(vectors, max_columns=10)
+    labels = [standardized_uri('en', word) for word in WORDLIST[:16]]
+    for board in [labels[:7], labels[3:10], labels[9:16], labels[:3] + labels[12:16]]:
+        ok_(np.allclose(cache.similarity(board), vectors.similarity(board), atol=1e-6))
+        ok_(len(cache.slots) <= 10)
+
+    # A board that doesn't fit in the cache is computed directly
+    ok_(np.allclose(cache.similarity(labels), vectors.similarity(labels), atol=1e-6))
+
+
 @with_setup(setup_board)
 def test_clue_is_ok():
     # make sure one can clue a word starting with 'ca', 'ta', 'pi'
@@ -68,9 +87,99 @@ def test_clue_is_ok():
     ok_(not BOARD.clue_is_ok('needle'))
 
 
+@with_setup(setup_board)
+def test_clue_mask():
+    clues = np.array(['CARROT', 'BASEBALL', 'FOREARM', 'AIRWAYS', 'TAPS', 'STATES', 'CENTRE'])
+    legal = BOARD.clue_mask(clues)
+    ok_(list(legal) == [BOARD.clue_is_ok(clue) for clue in clues])
+    ok_(not BOARD.clue_mask(clues, exclude={'carrot'})[0])
+
+
 @with_setup(setup_problematic_board)
 def test_problematic_board():
     spymaster_channel = FileStreamChannel.open_filename('/tmp/codenames_test.log')
     spymaster = AISpymaster(Team.red, spymaster_channel)
     clue_number, clue_word = spymaster.get_clue(BOARD)
     assert_not_equal(clue_word, '0')
+
+
+@with_setup(setup_board)
+def test_clue_stats():
+    stats = []
+    spymaster = AISpymaster(Team.red, NullChannel(), stats_hook=stats.append)
+    clue = spymaster.get_clue(BOARD)
+    ok_(len(stats) == 1)
+    ok_(stats[0].clue == clue)
+    ok_(set(stats[0].timings) >= {'similarity', 'legality', 'margin_probs', 'rank', 'choose'})
+    ok_(stats[0].counters['legal'] < stats[0].counters['vocabulary'])
+    ok_(len(stats[0].rejections) == 9)
+
+    # Later clues on the same board reuse its state
+    recorder = StatsRecorder()
+    spymaster.stats_hook = recorder
+    spymaster.get_clue(BOARD)
+    ok_(recorder.clues == 1)
+    ok_('similarity' not in recorder.timings)
+
+
+@with_setup(setup_board)
+def test_ai_guesser():
+    guesser = AIGuesser(Team.red, NullChannel())
+    guesser.receive_clue(2, 'mountain')
+    ranking = guesser.rank_words(BOARD.valid_guesses())
+    first = guesser.get_guess(BOARD)
+    ok_(first == ranking[0])
+    BOARD.reveal_word(first)
+    ok_(guesser.get_guess(BOARD) == ranking[1])
+    ok_(guesser.get_guess(BOARD) is None)
+
+
+@contextmanager
+def using_random_vectors():
+    """
+    Use random vectors for the Codenames words and some other clues, and an
+    index that forbids nothing, so no database is needed.
+    """
+    labels = [standardized_uri('en', word) for word in WORDLIST]
+    labels += ['/c/en/clue%d' % i for i in range(300)]
+    saved_vectors, saved_index = ai._vectors, legality._index
+    ai.set_vectors(random_vectors(labels=labels))
+    legality._index = {word: frozenset() for word in WORDLIST}
+    try:
+        yield
+    finally:
+        ai.set_vectors(saved_vectors)
+        legality._index = saved_index
+
+
+def test_get_clues_matches_get_clue():
+    with using_random_vectors():
+        boards = [CodenamesBoard.generate(random.Random(seed)) for seed in range(4)]
+        for board in boards[2:]:
+            board.reveal_word(board.words[0])
+        teams = [Team.red, Team.blue, Team.blue, Team.red]
+        requests = [(AISpymaster(team, NullChannel()), board) for (team, board) in zip(teams, boards)]
+        expected = [AISpymaster(team, NullChannel()).get_clue(board) for (team, board) in zip(teams, boards)]
+        ok_(AISpymaster.get_clues(requests) == expected)
+
+        # Spymasters the batch can't stand in for give their own clues
+        stats = []
+        requests = [
+            (AISpymaster(Team.red, NullChannel(), stats_hook=stats.append), boards[0]),
+            (ShortlistSpymaster(Team.blue, NullChannel()), boards[1]),
+        ]
+        clues = AISpymaster.get_clues(requests)
+        ok_(len(stats) == 1 and stats[0].clue == clues[0])
+        ok_(boards[1] in requests[1][0].board_states)
+
+
+def test_board_states_are_dropped():
+    with using_random_vectors():
+        spymaster = AISpymaster(Team.red, NullChannel())
+        boards = [CodenamesBoard.generate(random.Random(seed)) for seed in range(6)]
+        for board in boards:
+            spymaster.get_clue(board)
+        ok_(list(spymaster.board_states) == boards[-spymaster.max_board_states:])
+        ok_(spymaster.board_states[boards[-1]].good_sims.dtype == np.float32)
+        spymaster.end_game(boards[-1])
+        ok_(boards[-1] not in spymaster.board_states)
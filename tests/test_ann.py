@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+import numpy as np
+from nose.tools import eq_, ok_
+
+from codenames.ann import ClusterIndex, index_is_current, load_index
+from codenames.vectors import ClueVectors
+from tests.helpers import random_vectors
+
+
+def test_clusters_cover_rows():
+    vectors = random_vectors(nrows=500)
+    matrix = vectors.matrix
+    index = ClusterIndex.build(vectors, nclusters=16)
+    eq_(index.offsets[0], 0)
+    eq_(index.offsets[-1], len(matrix))
+    eq_(sorted(index.order), list(range(len(matrix))))
+
+
+def test_candidates():
+    vectors = random_vectors(nrows=500)
+    matrix = vectors.matrix
+    index = ClusterIndex.build(vectors, nclusters=16)
+    queries = matrix[[3, 141, 59]]
+    rows = index.candidates(vectors, queries, per_query=10, nprobe=2)
+    ok_(len(rows) <= 30)
+    ok_(np.all(np.diff(rows) > 0))
+    # Each query is its own nearest neighbor, in the cluster nearest to it
+    for row in (3, 141, 59):
+        ok_(row in rows)
+
+    # Searching every cluster finds the exact nearest neighbors
+    rows = index.candidates(vectors, queries[:1], per_query=10, nprobe=16)
+    eq_(sorted(rows), sorted(np.argsort(-(matrix @ queries[0]))[:10]))
+
+
+def test_load_index_saves_rebuilt_index():
+    vectors = random_vectors(nrows=500)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        matrix_filename = os.path.join(tmpdir, 'vectors.f32')
+        vectors.matrix.tofile(matrix_filename)
+        mapped = ClueVectors(vectors.labels, np.memmap(matrix_filename, dtype='f', mode='r',
+                                                       shape=vectors.matrix.shape))
+        index_filename = os.path.join(tmpdir, 'clusters.npz')
+        index = load_index(mapped, index_filename)
+        ok_(index_is_current(mapped, index_filename))
+        eq_(sorted(os.listdir(tmpdir)), ['clusters.npz', 'vectors.f32'])
+        # Other users can read it, if the umask lets them
+        ok_(os.stat(index_filename).st_mode & 0o444 == os.stat(matrix_filename).st_mode & 0o444)
+        ok_(np.array_equal(load_index(mapped, index_filename).order, index.order))
@@ -0,0 +1,104 @@
+import io
+
+from nose.tools import eq_, ok_, assert_raises
+
+from codenames import CodenamesBoard, Team, read_boards, write_boards
+
+
+def make_board():
+    words = ['WHIP', 'CORNER', 'EGYPT', 'CENTAUR', 'POISON', 'ROW', 'POUND']
+    spy_values = [Team.neutral, Team.blue, Team.blue, Team.red, Team.neutral,
+                  Team.assassin, Team.red]
+    return CodenamesBoard(words=words, spy_values=spy_values, known_values=[Team.unknown] * 7)
+
+
+def test_reveal_and_score():
+    board = make_board()
+    eq_(board.scores(), {Team.red: 2, Team.blue: 2})
+    eq_(board.winner(), Team.unknown)
+    eq_(board.get_word_team('EGYPT'), Team.blue)
+
+    board.reveal_word('CENTAUR')
+    board.reveal_word('WHIP')
+    eq_(board.scores(), {Team.red: 1, Team.blue: 2})
+    eq_(board.valid_guesses(), {'CORNER', 'EGYPT', 'POISON', 'ROW', 'POUND'})
+    eq_(board.unrevealed_items()[0], ('CORNER', Team.blue))
+    eq_(board.known_values[:4], [Team.neutral, Team.unknown, Team.unknown, Team.red])
+
+    # Revealing the same word twice doesn't count twice
+    board.reveal_word('CENTAUR')
+    eq_(board.scores()[Team.red], 1)
+
+    board.reveal_word('POUND')
+    eq_(board.winner(), Team.red)
+    assert_raises(ValueError, board.get_word_team, 'NOTAWORD')
+
+
+def test_team_values_write_through():
+    board = make_board()
+    board.known_values[3] = Team.red
+    eq_(board.known_values[3], Team.red)
+    eq_(board.valid_guesses(), {'WHIP', 'CORNER', 'EGYPT', 'POISON', 'ROW', 'POUND'})
+    eq_(board.scores(), {Team.red: 1, Team.blue: 2})
+
+    board.spy_values[0] = Team.blue
+    eq_(board.get_word_team('WHIP'), Team.blue)
+    eq_(board.scores(), {Team.red: 1, Team.blue: 3})
+
+    board.known_values = [Team.unknown] * 7
+    eq_(board.known_values, [Team.unknown] * 7)
+    ok_(board.known_values != None)
+    eq_(board.scores(), {Team.red: 2, Team.blue: 3})
+    assert_raises(ValueError, board.known_values.__setitem__, slice(0, 2), [Team.red])
+    assert_raises(TypeError, board.known_values.append, Team.red)
+
+
+def test_json_round_trip():
+    board = make_board()
+    board.reveal_word('ROW')
+    copy = CodenamesBoard.from_json(board.to_json())
+    eq_(copy.known_items(), board.known_items())
+    eq_(copy.spy_items(), board.spy_items())
+    eq_(copy.scores(), board.scores())
+    ok_(copy.get_word_team('ROW') is Team.assassin)
+
+
+def test_binary_round_trip():
+    board = make_board()
+    board.reveal_word('ROW')
+    data = board.to_bytes()
+    ok_(len(data) < len(board.to_json()))
+    copy = CodenamesBoard.from_bytes(data)
+    eq_(copy.known_items(), board.known_items())
+    eq_(copy.spy_items(), board.spy_items())
+    eq_(copy.scores(), board.scores())
+
+
+def test_binary_custom_words():
+    board = CodenamesBoard(['ÉCLAIR', 'ALPS', 'ICE CREAM'],
+                           [Team.red, Team.blue, Team.assassin],
+                           [Team.red, Team.unknown, Team.unknown])
+    copy = CodenamesBoard.from_bytes(board.to_bytes())
+    eq_(copy.known_items(), board.known_items())
+    eq_(copy.spy_items(), board.spy_items())
+
+
+def test_binary_limits():
+    long_word = CodenamesBoard(['É' * 128], [Team.red], [Team.unknown])
+    assert_raises(ValueError, long_word.to_bytes)
+    words = ['WORD%d' % i for i in range(256)]
+    many_words = CodenamesBoard(words, [Team.red] * 256, [Team.unknown] * 256)
+    assert_raises(ValueError, many_words.to_bytes)
+    huge = CodenamesBoard(['%03d' % i + 'X' * 252 for i in range(255)],
+                          [Team.red] * 255, [Team.unknown] * 255)
+    assert_raises(ValueError, write_boards, io.BytesIO(), [huge])
+
+
+def test_read_write_boards():
+    boards = [make_board(), CodenamesBoard.generate()]
+    boards[1].reveal_word(boards[1].words[0])
+    stream = io.BytesIO()
+    write_boards(stream, boards)
+    stream.seek(0)
+    copies = list(read_boards(stream))
+    eq_([copy.known_items() for copy in copies], [board.known_items() for board in boards])
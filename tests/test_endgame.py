@@ -0,0 +1,67 @@
+import os
+import tempfile
+from unittest import mock
+
+import numpy as np
+from nose.tools import eq_, ok_
+
+from codenames import endgame
+from codenames.endgame import position_values, solve
+
+
+def loop_position_values():
+    """
+    The nested loops that used to compute the table when `codenames.ai` was
+    imported.
+    """
+    values = np.ones(shape=(10, 10), dtype='f')
+    values[0, :] = 1.
+    values[1, :] = .99
+    values[:, 0] = 0.
+    for isum in range(3, 19):
+        for ours in range(1, min(10, isum)):
+            theirs = isum - ours
+            if theirs >= 10:
+                continue
+            values[ours, theirs] = 1 - min(
+                (values[theirs, ours - 1] * .99 +
+                 values[theirs, ours] * .01),
+                (values[theirs, max(ours - 2, 0)] * .5 +
+                 values[theirs, ours - 1] * .3 +
+                 values[theirs, ours] * .2),
+                (values[theirs, max(ours - 3, 0)] * .1 +
+                 values[theirs, max(ours - 2, 0)] * .4 +
+                 values[theirs, ours - 1] * .4 +
+                 values[theirs, ours] * .1)
+            )
+    return values
+
+
+def test_matches_loop():
+    ok_(np.allclose(solve(10), loop_position_values(), rtol=0., atol=1e-6))
+
+
+def test_larger_tables():
+    small = solve(10)
+    large = solve(16)
+    eq_(large.shape, (16, 16))
+    ok_(np.array_equal(large[:10, :10], small))
+    ok_(np.all((large >= 0) & (large <= 1)))
+
+
+def test_position_values():
+    eq_(position_values(4).shape, (10, 10))
+    ok_(position_values(13).shape[0] >= 13)
+    ok_(not position_values().flags.writeable)
+
+
+def test_read_only_data_dir():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # A data directory that can't be written to, even by root
+        data_dir = os.path.join(tmpdir, 'data')
+        open(data_dir, 'w').close()
+        cache_dir = os.path.join(tmpdir, 'cache')
+        with mock.patch.multiple(endgame, DATA_DIR=data_dir, CACHE_DIR=cache_dir):
+            table = endgame._load_or_solve(12)
+            eq_(os.listdir(cache_dir), [os.path.basename(endgame.table_filenames(12)[1])])
+            ok_(np.array_equal(endgame._load_or_solve(12), table))
@@ -0,0 +1,44 @@
+import io
+
+from nose.tools import eq_
+
+from codenames import Team
+from codenames.eventlog import EventLogChannel, read_events, replay, split_games
+from codenames.selfplay import RecordingChannel
+
+EVENTS = [
+    ('board', 'Host', [('STATE', Team.unknown), ('LOCK', Team.red), ('ALPS', Team.assassin)]),
+    ('status', 'Host', "Red AI spymaster's turn to give a clue."),
+    ('clue', 'Red AI spymaster', (2, 'mountain')),
+    ('reveal', 'Host', ('ALPS', Team.assassin)),
+    ('winner', 'Host', Team.blue),
+    ('notify', 'Blue AI spymaster', 'naïve 1 -> state (90%)'),
+]
+
+
+def test_round_trip():
+    for format in ('jsonl', 'binary'):
+        stream = io.BytesIO()
+        channel = EventLogChannel(stream, format)
+        for event in EVENTS:
+            channel.notify(*event)
+        # Nothing is written until the channel is flushed
+        eq_(stream.getvalue(), b'')
+        channel.flush()
+        stream.seek(0)
+        eq_(list(read_events(stream, format)), EVENTS)
+
+
+def test_replay():
+    stream = io.BytesIO()
+    channel = EventLogChannel(stream, 'binary')
+    for event in EVENTS * 2:
+        channel.notify(*event)
+    channel.flush()
+    stream.seek(0)
+
+    games = list(split_games(read_events(stream, 'binary')))
+    eq_([len(game) for game in games], [5, 6, 1])
+    recording = RecordingChannel()
+    replay(games[0], recording)
+    eq_(recording.events, EVENTS[:5])
@@ -0,0 +1,81 @@
+from nose.tools import eq_, ok_
+
+from conceptnet5.db import connection as db_connection
+
+from codenames import CodenamesBoard, Team, legality
+from codenames.legality import build_index, forms_of, get_finder
+
+
+def edge(start, end):
+    return {'start': {'@id': start}, 'end': {'@id': end}}
+
+
+class FakeFinder:
+    """
+    Answers FormOf queries from a fixed list of edges, instead of a
+    ConceptNet database.
+    """
+    def __init__(self, edges):
+        self.edges = edges
+        self.queries = 0
+
+    def query(self, criteria, limit=20, offset=0):
+        self.queries += 1
+        nodes = [criteria['node'], criteria.get('other', '')]
+        return [
+            e for e in self.edges
+            if all(e['start']['@id'].startswith(node) or e['end']['@id'].startswith(node)
+                   for node in nodes)
+        ][offset:offset + limit]
+
+
+FINDER = FakeFinder([
+    edge('/c/en/states/n', '/c/en/state/n'),
+    edge('/c/en/stated/v', '/c/en/state'),
+    edge('/c/en/centre', '/c/en/center'),
+    edge('/c/fr/centres', '/c/en/center'),
+])
+
+
+def test_forms_of():
+    eq_(forms_of(FINDER, 'STATE'), {'STATES', 'STATED'})
+    eq_(forms_of(FINDER, 'CENTER'), {'CENTRE'})
+    eq_(forms_of(FINDER, 'ALPS'), set())
+
+
+def test_build_index():
+    index = build_index(FINDER, ['STATE', 'CENTER'])
+    eq_(index['STATE'], {'STATES', 'STATED'})
+    eq_(index['CENTER'], {'CENTRE'})
+
+
+def test_board_finder_is_cached():
+    finder = FakeFinder(FINDER.edges)
+    # These words aren't in WORDLIST, so they're never in the index
+    board = CodenamesBoard(['STATE X', 'CENTER X'], [Team.red, Team.blue],
+                           [Team.unknown, Team.unknown], finder=finder)
+    ok_(board.finder is finder)
+    ok_(board.clue_is_ok('carrot'))
+    queries = finder.queries
+    ok_(board.clue_is_ok('carrot'))
+    eq_(finder.queries, queries)
+
+
+def test_forked_finder_forgets_connections():
+    parent_connection = object()
+    saved_connections = dict(db_connection._CONNECTIONS)
+    db_connection._CONNECTIONS['conceptnet5'] = parent_connection
+    saved_finder = legality._finder, legality._finder_pid
+    # Pretend this process was forked from another one that had a finder
+    legality._connections_pid = legality._finder_pid = -1
+    try:
+        finder = get_finder()
+        ok_(finder is not saved_finder[0])
+        ok_('conceptnet5' not in db_connection._CONNECTIONS)
+        ok_(parent_connection in legality._inherited_connections)
+        ok_(get_finder() is finder)
+    finally:
+        legality._finder, legality._finder_pid = saved_finder
+        legality._inherited_connections.remove(parent_connection)
+        db_connection._CONNECTIONS.clear()
+        db_connection._CONNECTIONS.update(saved_connections)
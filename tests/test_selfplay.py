@@ -0,0 +1,52 @@
+import numpy as np
+from nose.tools import eq_, ok_
+
+from codenames import Guesser, Spymaster, Team, ai
+from codenames.selfplay import DummySpymaster, play_game, play_games, play_games_parallel
+from codenames.vectors import ClueVectors
+
+
+class StuckSpymaster(Spymaster):
+    def name(self):
+        return 'Stuck spymaster'
+
+    def get_clue(self, board):
+        return (0, 'nothing')
+
+
+class PassingGuesser(Guesser):
+    def name(self):
+        return 'Passing guesser'
+
+    def get_guess(self, board):
+        return None
+
+
+def test_play_games():
+    report = play_games(10, seed=5, spymaster_class=DummySpymaster)
+    eq_(report.games, 10)
+    eq_(sum(report.wins().values()), 10)
+    ok_(report.mean_turns >= 1)
+    ok_(0 <= report.win_rate(Team.red) <= 1)
+
+    # The same seed plays the same games
+    eq_(play_games(10, seed=5, spymaster_class=DummySpymaster).results, report.results)
+
+
+def test_max_turns():
+    result = play_game(3, StuckSpymaster, PassingGuesser, max_turns=12)
+    eq_(result.winner, Team.unknown)
+    eq_(result.turns, 12)
+
+
+def test_play_games_parallel():
+    # Copy the vectors into memory, so the workers attach to shared memory
+    # instead of mapping the store
+    vectors = ai.get_vectors()
+    ai.set_vectors(ClueVectors(vectors.labels, np.array(vectors.matrix), vectors.scales,
+                               vectors.vocab))
+    try:
+        report = play_games_parallel(6, seed=2, spymaster_class=DummySpymaster, workers=2)
+        eq_(report.results, play_games(6, seed=2, spymaster_class=DummySpymaster).results)
+    finally:
+        ai.set_vectors(vectors)
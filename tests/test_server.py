@@ -0,0 +1,40 @@
+import asyncio
+
+from nose.tools import eq_, ok_
+
+from codenames import WORDLIST
+from codenames.ai import DummySpymaster
+from codenames.server import GameServer
+
+
+async def play_through_server():
+    """
+    Connect to a server with dummy spymasters, and guess every word in
+    `WORDLIST` in turn until the game ends. Returns what the server sent.
+    """
+    server = GameServer(spymaster_class=DummySpymaster)
+    tcp_server = await asyncio.start_server(server.handle_connection, 'localhost', 0)
+    port = tcp_server.sockets[0].getsockname()[1]
+    async with tcp_server:
+        reader, writer = await asyncio.open_connection('localhost', port)
+        received = ''
+        guesses = iter(WORDLIST)
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            received += data.decode('utf-8')
+            if received.endswith('> '):
+                writer.write((next(guesses) + '\n').encode('utf-8'))
+                await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+    eq_(server.games, 0)
+    return received
+
+
+def test_game_server():
+    received = asyncio.run(play_through_server())
+    ok_('[Red dummy spymaster] Clue: dummy clue 9' in received)
+    ok_('not an available word' in received)
+    ok_(received.rstrip().endswith('wins.'))
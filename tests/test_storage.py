@@ -0,0 +1,33 @@
+import os
+import stat
+import tempfile
+
+from nose.tools import assert_raises, eq_
+
+from codenames.storage import atomic_write
+
+
+def test_atomic_write():
+    umask = os.umask(0o022)
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'table.bin')
+            with atomic_write(filename) as out:
+                out.write(b'first')
+            with atomic_write(filename) as out:
+                out.write(b'second')
+            with open(filename, 'rb') as infile:
+                eq_(infile.read(), b'second')
+            # Readable by everyone, like any other new file
+            eq_(stat.S_IMODE(os.stat(filename).st_mode), 0o644)
+
+            # A failed write leaves the old file, and no temporary file
+            with assert_raises(ZeroDivisionError):
+                with atomic_write(filename) as out:
+                    out.write(b'third')
+                    1 / 0
+            eq_(os.listdir(tmpdir), ['table.bin'])
+            with open(filename, 'rb') as infile:
+                eq_(infile.read(), b'second')
+    finally:
+        os.umask(umask)
@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+import numpy as np
+from nose.tools import assert_raises, eq_, ok_
+
+from codenames.vectors import SCALES_SUFFIX, ClueVectors, Vocabulary, open_store, quantize
+from tests.helpers import random_vectors
+
+
+def test_quantize():
+    vectors = random_vectors()
+    labels = ['/c/en/3', '/c/en/missing', '/c/en/50']
+    expected = vectors.similarity(labels)
+    for dtype, tolerance in [('float32', 0.), ('float16', 1e-3), ('int8', 2e-2)]:
+        quantized = quantize(vectors, dtype)
+        eq_(quantized.dtype, dtype)
+        sims = quantized.similarity(labels)
+        eq_(sims.dtype, np.float32)
+        ok_(np.allclose(sims, expected, rtol=0., atol=tolerance))
+        # Unknown labels have zero similarity to everything
+        ok_(not sims[:, 1].any())
+        ok_(np.allclose(quantized.rows([3, 50]), vectors.matrix[[3, 50]], atol=tolerance))
+
+
+def test_vocabulary():
+    labels = ['/c/en/state', '/c/en/ice_cream', '/c/en/the', '/c/en/water', '/c/en/apple']
+    vocab = Vocabulary.from_labels(labels, [4.5, 4., 7.7, 5.6, 4.9], nfixed=2)
+    eq_(list(vocab.words), ['state', 'ice cream', 'the', 'water', 'apple'])
+    eq_(vocab.clue_words[1], 'ICE CREAM')
+    eq_(vocab.size_above(3.), 5)
+    eq_(vocab.size_above(5.), 4)
+    eq_(vocab.size_above(8.), 2)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, 'vocab.npz')
+        vocab.save(filename)
+        loaded = Vocabulary.load(filename)
+    eq_(list(loaded.labels), labels)
+    eq_(loaded.nfixed, 2)
+    ok_(np.array_equal(loaded.zipf, vocab.zipf))
+
+    matrix = np.eye(5, dtype='f')
+    vectors = ClueVectors(labels, matrix, vocab=vocab).above_frequency(5.)
+    eq_(vectors.labels, labels[:4])
+    eq_(list(vectors.clue_words), ['STATE', 'ICE CREAM', 'THE', 'WATER'])
+    ok_(np.shares_memory(vectors.matrix, matrix))
+
+
+def test_open_int8_store():
+    quantized = quantize(random_vectors(nrows=10), 'int8')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        matrix_filename = os.path.join(tmpdir, 'vectors.i8')
+        labels_filename = os.path.join(tmpdir, 'labels.txt')
+        vocab_filename = os.path.join(tmpdir, 'missing.npz')
+        quantized.matrix.tofile(matrix_filename)
+        quantized.scales.tofile(matrix_filename + SCALES_SUFFIX)
+        with open(labels_filename, 'w', encoding='utf-8') as out:
+            for label in quantized.labels:
+                print(label, file=out)
+        store = open_store(matrix_filename, labels_filename, 'int8', vocab_filename)
+        ok_(np.array_equal(store.rows([2, 7]), quantized.rows([2, 7])))
+
+        # A scales file that doesn't match the rows is an error
+        quantized.scales[:9].tofile(matrix_filename + SCALES_SUFFIX)
+        assert_raises(ValueError, open_store, matrix_filename, labels_filename, 'int8',
+                      vocab_filename)